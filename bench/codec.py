@@ -0,0 +1,82 @@
+"""
+Compares routing message codecs on full LINK_STATE simulations.
+
+    $ python -m bench.codec [event ...]
+
+Defaults to testing_suite/case_8.event and testing_suite/case_10.event, run headless.
+For every codec it reports wall time of the whole run, time spent inside
+encode/decode, and the total number of message bytes delivered.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import time
+
+from simulator.node import Json_Codec, Binary_Codec
+from link_state_node import Link_State_Node
+
+DEFAULT_EVENTS = ["testing_suite/case_8.event", "testing_suite/case_10.event"]
+
+CODECS = [Json_Codec(), Binary_Codec()]
+
+
+class Timed_Codec:
+    """Wraps a codec and accumulates the time spent in it."""
+
+    def __init__(self, codec):
+        self.codec = codec
+        self.name = codec.name
+        self.encode_time = 0.0
+        self.decode_time = 0.0
+
+    def encode(self, message):
+        start = time.perf_counter()
+        m = self.codec.encode(message)
+        self.encode_time += time.perf_counter() - start
+        return m
+
+    def decode(self, m):
+        start = time.perf_counter()
+        message = self.codec.decode(m)
+        self.decode_time += time.perf_counter() - start
+        return message
+
+
+def run(event_file, codec):
+    from sim import Sim
+
+    timed = Timed_Codec(codec)
+    default_codec = Link_State_Node.codec
+    Link_State_Node.codec = timed
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            s = Sim("LINK_STATE", event_file, "NO_STOP", headless=True)
+    finally:
+        Link_State_Node.codec = default_codec
+    return {
+        "event": event_file,
+        "codec": codec.name,
+        "wall_time": time.perf_counter() - start,
+        "encode_time": timed.encode_time,
+        "decode_time": timed.decode_time,
+        "messages": s.message_count,
+        "message_bytes": s.message_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark routing message codecs.')
+    parser.add_argument('events', nargs='*', default=DEFAULT_EVENTS, help='event files to simulate')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    for event_file in args.events:
+        for codec in CODECS:
+            print(json.dumps(run(event_file, codec)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Compares the DISTANCE_VECTOR update policies on full simulations.
+
+    $ python -m bench.dv_updates [event ...]
+
+Defaults to adversarial_cases/delete_and_rebuild.event, adversarial_cases/island_link.event
+and testing_suite/case_8.event, run headless. Every policy turns on one of triggered-update
+coalescing, poison reverse and hold-down over plain distance vector, and "all" is the
+default of Distance_Vector_Node. For each it reports the routing messages and bytes
+delivered, wall time and the DRAW_* checks passed. Plain distance vector counts to
+infinity on testing_suite/case_4.event and adversarial_cases/island_node.event, so only
+hold-down and "all" finish those.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import time
+
+from distance_vector_node import Distance_Vector_Node
+
+DEFAULT_EVENTS = ["adversarial_cases/delete_and_rebuild.event", "adversarial_cases/island_link.event",
+                  "testing_suite/case_8.event"]
+
+PLAIN = {"update_window": 0, "poison_reverse": False, "hold_down": 0}
+
+POLICIES = {
+    "plain": {},
+    "window": {"update_window": Distance_Vector_Node.update_window},
+    "poison": {"poison_reverse": True},
+    "hold-down": {"hold_down": Distance_Vector_Node.hold_down},
+    "all": {name: getattr(Distance_Vector_Node, name) for name in PLAIN},
+}
+
+
+def run(event_file, policy):
+    from sim import Sim
+
+    settings = dict(PLAIN, **POLICIES[policy])
+    defaults = {name: getattr(Distance_Vector_Node, name) for name in settings}
+    for name, value in settings.items():
+        setattr(Distance_Vector_Node, name, value)
+    results = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            s = Sim("DISTANCE_VECTOR", event_file, "NO_STOP", results=results)
+    finally:
+        for name, value in defaults.items():
+            setattr(Distance_Vector_Node, name, value)
+    checks = [json.loads(line)["correct"] for line in results.getvalue().splitlines()]
+    return {
+        "event": event_file,
+        "policy": policy,
+        "wall_time": time.perf_counter() - start,
+        "messages": s.message_count,
+        "message_bytes": s.message_bytes,
+        "checks_passed": sum(check is True for check in checks),
+        "checks": len(checks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark distance vector update policies.')
+    parser.add_argument('events', nargs='*', default=DEFAULT_EVENTS, help='event files to simulate')
+    parser.add_argument('--policies', nargs='+', choices=list(POLICIES), default=list(POLICIES),
+                        help='policies to compare')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    for event_file in args.events:
+        for policy in args.policies:
+            print(json.dumps(run(event_file, policy)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Measures interpreter start-up cost of the simulator with python -X importtime.
+
+    $ python -m bench.import_time [--top N]
+
+Imports sim in a fresh interpreter, then runs a headless NO_STOP LINK_STATE
+simulation of demo.event, and reports the cumulative import time of sim, the
+slowest modules, and whether networkx, matplotlib or numpy got loaded on the way.
+Exits with 1 if any did: a headless run must never load the first two, and only
+DISTANCE_VECTOR nodes load numpy.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+# Modules neither importing sim nor a headless LINK_STATE run may load
+HEAVY_MODULES = ["networkx", "matplotlib", "numpy"]
+PRINT_LOADED = "print(*(module in sys.modules for module in %r), file=sys.stderr)" % HEAVY_MODULES
+
+IMPORT_SIM = "import sys, sim; " + PRINT_LOADED
+HEADLESS_RUN = "import sys, sim; sim.Sim('LINK_STATE', 'demo.event', 'NO_STOP', headless=True); " + PRINT_LOADED
+
+
+def import_times(code):
+    """
+    Runs code under -X importtime and returns ({ module: cumulative microseconds }, last stderr line).
+    """
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    times = {}
+    last = ""
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:"):
+            last = line
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        times[fields[2].strip()] = int(fields[1])
+    return times, last
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark simulator import time.')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest modules to list')
+    args = parser.parse_args()
+
+    times, flags = import_times(IMPORT_SIM)
+    imported = dict(zip(HEAVY_MODULES, (flag == "True" for flag in flags.split())))
+    print(json.dumps({
+        "import_sim_us": times.get("sim"),
+        "slowest": sorted(times.items(), key=lambda kv: -kv[1])[:args.top],
+        **{module + "_loaded": loaded for module, loaded in imported.items()},
+    }))
+
+    start = time.perf_counter()
+    times, flags = import_times(HEADLESS_RUN)
+    run = dict(zip(HEAVY_MODULES, (flag == "True" for flag in flags.split())))
+    print(json.dumps({
+        "headless_run_seconds": time.perf_counter() - start,
+        **{module + "_loaded": loaded for module, loaded in run.items()},
+    }))
+
+    failures = ["%s loaded %s" % (what, " and ".join(module for module, loaded in modules.items() if loaded))
+                for what, modules in (("import sim", imported), ("headless run", run)) if any(modules.values())]
+    if failures:
+        sys.exit(", ".join(failures))
+
+
+if __name__ == '__main__':
+    main()
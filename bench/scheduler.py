@@ -0,0 +1,59 @@
+"""
+Hold-model benchmark of the Event_Queue scheduler backends.
+
+    $ python -m bench.scheduler [--events N] [--pending N]
+
+Keeps a fixed number of events pending and repeatedly pops the earliest one
+and posts a replacement a random 0..MAX_LATENCY ticks later, as routing
+message arrivals do. Every few hundred holds a far-future event is posted,
+like the DRAW_* commands at the end of an event file.
+"""
+import argparse
+import json
+import random
+import time
+
+from simulator.config import *
+from simulator.event import Event
+from simulator.event_queue import Event_Queue
+from generate_simulation import MAX_LATENCY
+
+
+def hold(scheduler, events, pending, seed=0):
+    rnd = random.Random(seed)
+    q = Event_Queue(scheduler)
+    for _ in range(pending):
+        q.post(Event(rnd.randint(0, MAX_LATENCY), EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL, None))
+
+    start = time.perf_counter()
+    for i in range(events):
+        e = q.get_earliest()
+        if i % 500 == 0:
+            q.post(Event(e.time_stamp + 10000, EVENT_TYPE.DRAW_TREE, None))
+        elif i % 7 == 0:
+            q.post(Event(e.time_stamp, EVENT_TYPE.SEND_LINK, None))
+        else:
+            q.post(Event(e.time_stamp + rnd.randint(0, MAX_LATENCY), EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL, None))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "scheduler": scheduler,
+        "events": events,
+        "pending": pending,
+        "seconds": elapsed,
+        "events_per_sec": events / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark event queue scheduler backends.')
+    parser.add_argument('--events', type=int, default=1000000, help='number of pop + post operations')
+    parser.add_argument('--pending', type=int, default=10000, help='events kept in the queue')
+    args = parser.parse_args()
+
+    for scheduler in SCHEDULER:
+        print(json.dumps(hold(scheduler, args.events, args.pending)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Checks that --skip-idle cuts every quiet stretch out of the clock.
+
+    $ python -m bench.skip_idle [--gap SECONDS] [--algorithms ALGO ...]
+
+Simulates a small topology whose DRAW_PATHs are each followed by a long gap before the
+next topology change, once tracking convergence and once skipping idle time. Skipping
+must leave the routing alone, with the same messages and DRAW_* verdicts, while every
+epoch opens at the time of the DRAW_* before it and every DRAW_* happens when the epoch
+before it ended. Prints one JSON line per algorithm, and exits with 1 at the first failure.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+
+from sim import Sim
+
+# A square with one diagonal: the first DRAW_PATH goes 0-2 direct, the second round it
+COMMANDS = [
+    "0 ADD_LINK 0 1 2",
+    "0 ADD_LINK 1 2 2",
+    "0 ADD_LINK 2 3 2",
+    "0 ADD_LINK 3 0 2",
+    "0 ADD_LINK 0 2 3",
+    "{draw} DRAW_PATH 0 2",
+    "{change} CHANGE_LINK 0 2 9",
+    "{draw2} DRAW_PATH 0 2",
+    "{change2} DELETE_LINK 1 2",
+    "{draw3} DRAW_PATH 0 2",
+]
+
+
+def run(algorithm, event_file, mode):
+    results = io.StringIO()
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = Sim(algorithm, event_file, "NO_STOP", results=results, converge=mode)
+    records = [json.loads(line) for line in results.getvalue().splitlines()]
+    return s, records
+
+
+def failure(algorithm, gap):
+    """Returns what went wrong for algorithm, or None, and the skipping run's records."""
+    with tempfile.TemporaryDirectory() as tmp:
+        event_file = os.path.join(tmp, "gap.event")
+        with open(event_file, 'w') as f:
+            times = {"draw": 100, "change": 100 + gap, "draw2": 200 + gap, "change2": 200 + 2 * gap,
+                     "draw3": 300 + 2 * gap}
+            f.write("\n".join(command.format(**times) for command in COMMANDS) + "\n")
+        tracked, tracked_records = run(algorithm, event_file, 'TRACK')
+        skipped, records = run(algorithm, event_file, 'SKIP')
+
+    draws = [record for record in records if record["event"] == "DRAW_PATH"]
+    epochs = [record for record in records if record["event"] == "CONVERGENCE"]
+    if skipped.message_count != tracked.message_count:
+        return "%d messages skipping idle time, %d without" % (skipped.message_count, tracked.message_count), records
+    if [r["correct"] for r in draws] != [r["correct"] for r in tracked_records if r["event"] == "DRAW_PATH"]:
+        return "DRAW_PATH verdicts differ from the run without skipping", records
+    if not all(draw["correct"] for draw in draws) or not all(epoch["converged"] for epoch in epochs):
+        return "routing got something wrong, see the records", records
+    if len(epochs) != len(draws):
+        return "%d epochs for %d DRAW_PATHs" % (len(epochs), len(draws)), records
+    for i, (epoch, draw) in enumerate(zip(epochs, draws)):
+        if draw["time"] != epoch["end"]:
+            return "DRAW_PATH %d at time %d, its epoch ended at %d" % (i, draw["time"], epoch["end"]), records
+        if i + 1 < len(epochs) and epochs[i + 1]["start"] != draw["time"]:
+            return "epoch %d opened at time %d, %d after the DRAW_PATH before it" % (
+                i + 1, epochs[i + 1]["start"], epochs[i + 1]["start"] - draw["time"]), records
+    return None, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that --skip-idle cuts every quiet stretch out of the clock.')
+    parser.add_argument('--gap', type=int, default=1000000, help='seconds from each DRAW_PATH to the next change')
+    parser.add_argument('--algorithms', nargs='+', default=["LINK_STATE", "DISTANCE_VECTOR"],
+                        help='routing algorithms to check')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    for algorithm in args.algorithms:
+        error, records = failure(algorithm, args.gap)
+        if error is not None:
+            print("%s: %s" % (algorithm, error), file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps({"algorithm": algorithm, "gap": args.gap,
+                          "draw_times": [r["time"] for r in records if r["event"] == "DRAW_PATH"]}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Checks and times the incremental shortest path tree of Link_State_Node against a full recompute.
+
+    $ python -m bench.spf [--nodes N] [--degree D] [--changes C] [--seed S]
+
+Builds a random connected graph, then applies random link cost increases, decreases,
+deletions and additions one at a time. After each one, Shortest_Path_Tree is repaired
+and compared with dijkstra() over the same graph: every distance must agree and every
+next hop must lead along a shortest path. Prints one JSON line with the time spent in
+each, and exits with 1 at the first mismatch.
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+
+from link_state_node import Shortest_Path_Tree, dijkstra, first_hops
+
+CHANGES = ["increase", "decrease", "delete", "add"]
+
+
+def random_graph(rng, nodes, degree):
+    graph = {v: {} for v in range(nodes)}
+    # A random spanning tree first, so everything starts reachable
+    for v in range(1, nodes):
+        u = rng.randrange(v)
+        graph[u][v] = graph[v][u] = rng.randint(1, 20)
+    for _ in range(nodes * (degree - 2) // 2):
+        u, v = rng.sample(range(nodes), 2)
+        graph[u][v] = graph[v][u] = rng.randint(1, 20)
+    return graph
+
+
+def change_link(rng, graph, tree):
+    """Applies one random change to both directions of a link, repairing tree after each as a node does."""
+    kind = rng.choice(CHANGES)
+    u = rng.choice(list(graph))
+    if kind == "add" or not graph[u]:
+        v = rng.choice([v for v in graph if v != u])
+        cost = rng.randint(1, 20)
+    else:
+        v = rng.choice(list(graph[u]))
+        cost = {"increase": graph[u][v] + rng.randint(1, 20),
+                "decrease": max(1, graph[u][v] - rng.randint(1, 20)),
+                "delete": None}[kind]
+
+    start = time.perf_counter()
+    for a, b in ((u, v), (v, u)):
+        if cost is None:
+            del graph[a][b]
+        else:
+            graph[a][b] = cost
+        tree.update_edge(a, b)
+    return kind, u, v, time.perf_counter() - start
+
+
+def mismatch(graph, tree, source):
+    """Returns a description of the first way tree disagrees with a full recompute, or None."""
+    inf = float('inf')
+    start = time.perf_counter()
+    dist, prev = dijkstra(graph, source)
+    first_hops(prev, source)
+    elapsed = time.perf_counter() - start
+
+    for v in graph:
+        if dist.get(v, inf) != tree.dist.get(v, inf):
+            return "distance to %s is %s, full recompute says %s" % (v, tree.dist.get(v, inf), dist.get(v, inf)), elapsed
+        if v == source or dist.get(v, inf) == inf:
+            if v != source and tree.next_hop.get(v, -1) != -1:
+                return "next hop to unreachable %s is %s" % (v, tree.next_hop[v]), elapsed
+            continue
+        # The tree edge into v lies on a shortest path and v is reached through its parent's next hop,
+        # so by induction the next hop starts a shortest path to v
+        parent = tree.prev.get(v)
+        if parent is None or parent not in graph or v not in graph[parent] or tree.dist[parent] + graph[parent][v] != dist[v]:
+            return "parent of %s is %s, not on a shortest path" % (v, parent), elapsed
+        if tree.next_hop.get(v) != (v if parent == source else tree.next_hop.get(parent)):
+            return "next hop to %s is %s, not its parent's" % (v, tree.next_hop.get(v)), elapsed
+    return None, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the incremental SPF against a full recompute.')
+    parser.add_argument('--nodes', type=int, default=200, help='vertices in the graph')
+    parser.add_argument('--degree', type=int, default=4, help='mean degree')
+    parser.add_argument('--changes', type=int, default=2000, help='link changes to apply')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    rng = random.Random(args.seed)
+    graph = random_graph(rng, args.nodes, args.degree)
+    source = 0
+    tree = Shortest_Path_Tree(graph, source, logging.getLogger('spf'))
+
+    incremental_time = full_time = 0.0
+    for i in range(args.changes):
+        kind, u, v, elapsed = change_link(rng, graph, tree)
+        incremental_time += elapsed
+        error, elapsed = mismatch(graph, tree, source)
+        full_time += elapsed
+        if error is not None:
+            print("change %d (%s %s-%s): %s" % (i, kind, u, v, error), file=sys.stderr)
+            sys.exit(1)
+
+    print(json.dumps({"nodes": args.nodes, "changes": args.changes, "seed": args.seed,
+                      "incremental_time": incremental_time, "full_time": full_time}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Standard benchmark scenarios for the simulator core, compared against a stored baseline.
+
+    $ python -m bench.suite [--scenarios NAME ...] [--algorithms ALGO ...] [--baseline FILE] [--save]
+
+Runs case_8 and case_10 from testing_suite/ and seeded generated topologies of 1k,
+10k and 100k nodes through Sim headless, every (scenario, algorithm) pair in a
+fresh worker process so its peak RSS is its own. Each case is one JSON line with
+events/sec, routing messages/sec, peak RSS and time-to-convergence as --converge
+times its epochs, followed by one line of per-algorithm totals and, if a baseline
+exists, one line per metric that got worse than the baseline by more than
+--tolerance. Exits with 1 if any did.
+
+LINK_STATE floods every change to every node, so it only runs up to gen-1k by
+default; the larger topologies measure the core with GENERIC and DISTANCE_VECTOR.
+Generated scenarios always run with batch delivery, see Sim.dispatch_arrivals.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import resource
+import signal
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from simulator.config import *
+from sim import Sim
+from simulator.convergence import Convergence_Detector
+from generate_simulation import generate_simulation
+from tester import Case_Timeout, on_alarm
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Generated scenarios share everything but the size, see generate_simulation
+GENERATED = {"degree": 3, "time": 2000, "model": "waxman", "seed": 1, "draws": 5}
+
+SCENARIOS = {
+    "case_8": {"event": "testing_suite/case_8.event", "algorithms": ["DISTANCE_VECTOR", "LINK_STATE"]},
+    "case_10": {"event": "testing_suite/case_10.event", "algorithms": ["DISTANCE_VECTOR", "LINK_STATE"]},
+    "gen-1k": {"batch": True, "nodes": 1000, "algorithms": ["GENERIC", "DISTANCE_VECTOR", "LINK_STATE"]},
+    "gen-10k": {"batch": True, "nodes": 10000, "algorithms": ["GENERIC", "DISTANCE_VECTOR"]},
+    "gen-100k": {"batch": True, "nodes": 100000, "algorithms": ["GENERIC"]},
+}
+
+# Metrics compared against the baseline, and whether a larger value is better
+METRICS = {
+    "events_per_sec": True,
+    "messages_per_sec": True,
+    "seconds": False,
+    "peak_rss_mb": False,
+    "messages": False,
+    "message_bytes": False,
+    "convergence_max": False,
+}
+
+
+class Bench_Sim(Sim):
+    """
+    Sim that tracks convergence like --converge and keeps only the verdict of each
+    DRAW_* check.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.checks = [] # verdict of each DRAW_* check, None if it could not be checked
+        super().__init__(*args, converge='TRACK', **kwargs)
+
+    def report(self, record):
+        # Keep the verdict only, the paths of a failed DRAW_TREE on a large topology take gigabytes as JSON
+        if record["event"] != "CONVERGENCE":
+            self.checks.append(record["correct"])
+
+
+def run_case(scenario, algorithm, event_file, batch, timeout):
+    """
+    Simulates one scenario and returns its metrics. Runs in a worker process of its
+    own, so ru_maxrss is the peak of this case alone.
+    """
+    logging.disable(logging.CRITICAL)
+    # Walking every pair at each quiescence would swamp the times measured, so epochs are only timed
+    Convergence_Detector.check_forwarding = False
+    case = {"scenario": scenario, "algorithm": algorithm, "batch": batch, "status": "ok"}
+    if timeout:
+        signal.signal(signal.SIGALRM, on_alarm)
+        signal.alarm(timeout)
+
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            s = Bench_Sim(algorithm, event_file, "NO_STOP", batch=batch, results=io.StringIO())
+    except Case_Timeout:
+        case["status"] = "timeout"
+        return case
+    finally:
+        signal.alarm(0)
+    seconds = time.perf_counter() - start
+
+    times = [epoch["convergence_time"] for epoch in s.convergence.epochs]
+    case.update({
+        "seconds": seconds,
+        "events": s.event_count,
+        "events_per_sec": s.event_count / seconds,
+        "messages": s.message_count,
+        "messages_per_sec": s.message_count / seconds,
+        "message_bytes": s.message_bytes,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10),
+        "epochs": len(times),
+        "convergence_mean": sum(times) / len(times) if times else 0,
+        "convergence_max": max(times, default=0),
+        "checks": len(s.checks),
+        "checks_passed": sum(check is True for check in s.checks),
+    })
+    return case
+
+
+def isolated(*args):
+    # A fresh worker per case, so no case inherits another's peak RSS or warm caches
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(run_case, *args).result()
+
+
+def generate(scenario, directory):
+    """Returns the event file of scenario, generating it into directory if needed."""
+    spec = SCENARIOS[scenario]
+    if "event" in spec:
+        return spec["event"]
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_simulation(spec["nodes"], filename=os.path.join(directory, scenario), **GENERATED)
+    return os.path.join(directory, scenario + ".event")
+
+
+def totals(cases):
+    ans = {}
+    for case in cases:
+        if case["status"] != "ok":
+            continue
+        total = ans.setdefault(case["algorithm"], {"cases": 0, "seconds": 0, "events": 0, "messages": 0, "message_bytes": 0})
+        total["cases"] += 1
+        for metric in ("seconds", "events", "messages", "message_bytes"):
+            total[metric] += case[metric]
+    for total in ans.values():
+        total["events_per_sec"] = total["events"] / total["seconds"]
+        total["messages_per_sec"] = total["messages"] / total["seconds"]
+    return {"totals": ans}
+
+
+def regressions(cases, baseline, tolerance):
+    """Yields one record for every metric of cases that is worse than in baseline by more than tolerance."""
+    for case in cases:
+        key = "%s/%s" % (case["scenario"], case["algorithm"])
+        if key not in baseline or baseline[key]["batch"] != case["batch"]:
+            continue
+        if case["status"] != "ok":
+            yield {"regression": key, "status": case["status"]}
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = baseline[key].get(metric), case[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                yield {"regression": key, "metric": metric, "baseline": old, "value": new, "change": change}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the standard benchmark scenarios.')
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--algorithms', nargs='+', choices=ROUTE_ALGORITHM,
+                        help='run these on every scenario instead of the scenario\'s own')
+    parser.add_argument('--batch', action='store_true', help='deliver each node\'s messages of one second together in every scenario')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per case, the fastest is kept')
+    parser.add_argument('--timeout', type=int, default=1800, help='seconds per case, 0 for none')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='relative change that counts as a regression')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args()
+
+    cases = []
+    with tempfile.TemporaryDirectory(prefix='bench_') as directory:
+        for scenario in args.scenarios:
+            event_file = generate(scenario, directory)
+            for algorithm in args.algorithms or SCENARIOS[scenario]["algorithms"]:
+                # Keep the fastest of the repeats, the counts are the same in all of them
+                batch = args.batch or SCENARIOS[scenario].get("batch", False)
+                case = min((isolated(scenario, algorithm, event_file, batch, args.timeout)
+                            for _ in range(args.repeat)), key=lambda case: case.get("seconds", math.inf))
+                print(json.dumps(case), flush=True)
+                cases.append(case)
+    print(json.dumps(totals(cases)))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressed = list(regressions(cases, baseline, args.tolerance))
+    for record in regressed:
+        print(json.dumps(record))
+
+    if args.save:
+        baseline.update({"%s/%s" % (case["scenario"], case["algorithm"]): case for case in cases if case["status"] == "ok"})
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
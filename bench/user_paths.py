@@ -0,0 +1,106 @@
+"""
+Checks and times the next-hop walks behind DRAW_PATH and DRAW_TREE.
+
+    $ python -m bench.user_paths [event] [--algorithm ALGO]
+
+Simulates event headless, then runs a DRAW_TREE from every node while counting the
+get_next_hop calls it makes. With the walks sharing Topology.user_path_caches, each
+node must be asked at most once per destination, and every path must equal one
+walked with fresh caches. One link is then made dearer and the simulation run on, so
+the sweep is checked again against caches from the old forwarding state. Prints one
+JSON line with the calls and time of each sweep, and exits with 1 at the first failure.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import sys
+import time
+
+from simulator.config import EVENT_TYPE
+from simulator.event import Event
+
+
+def count_next_hops(sim):
+    """Wraps get_next_hop of every node of sim to count its calls, returns the one-item counter list."""
+    calls = [0]
+    for node in sim.nodes.values():
+        def counted(destination, get_next_hop=type(node).get_next_hop.__get__(node)):
+            calls[0] += 1
+            return get_next_hop(destination)
+        node.get_next_hop = counted
+    return calls
+
+
+def sweep(sim, calls):
+    """Runs a DRAW_TREE from every node, returns the get_next_hop calls and seconds it took."""
+    sim.user_paths = None # start empty, not from what the event file's own DRAW_* commands left
+    calls[0] = 0
+    start = time.perf_counter()
+    for source in list(sim.adj):
+        sim.draw_tree(source)
+    return calls[0], time.perf_counter() - start
+
+
+def mismatch(sim, calls):
+    """
+    Returns the first pair whose shared-cache path differs from a fresh walk, or None,
+    and the get_next_hop calls of the fresh walks, what a sweep costs without sharing.
+    """
+    calls[0] = 0
+    hops, memo = sim.user_path_caches()
+    for source in sim.adj:
+        for destination in sim.adj:
+            if destination == source:
+                continue
+            shared = sim.get_user_path(source, destination, hops, memo, quiet=True)
+            fresh = sim.get_user_path(source, destination, quiet=True)
+            if shared != fresh:
+                return "path %s -> %s is %s, a fresh walk says %s" % (source, destination, shared[0], fresh[0]), calls[0]
+    return None, calls[0]
+
+
+def check(sim, label):
+    nodes = len(sim.adj)
+    calls = count_next_hops(sim)
+    shared_calls, seconds = sweep(sim, calls)
+    if shared_calls > nodes * (nodes - 1):
+        print("%s: %d get_next_hop calls for %d nodes, more than one per (node, destination)" % (
+            label, shared_calls, nodes), file=sys.stderr)
+        sys.exit(1)
+    error, fresh_calls = mismatch(sim, calls)
+    if error is not None:
+        print("%s: %s" % (label, error), file=sys.stderr)
+        sys.exit(1)
+    return {"nodes": nodes, "calls": shared_calls, "unshared_calls": fresh_calls, "seconds": seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check and time the shared next-hop walks of DRAW_* checks.')
+    parser.add_argument('event', nargs='?', default="testing_suite/case_10.event", help='event file to simulate')
+    parser.add_argument('--algorithm', default="LINK_STATE", help='routing algorithm of the nodes')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    from sim import Sim
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim = Sim(args.algorithm, args.event, "NO_STOP", results=io.StringIO())
+    before = check(sim, "after the event file")
+
+    caches = sim.user_path_caches()
+    node = next(node for node in sim.adj if sim.adj[node])
+    neighbor, latency = next(iter(sim.adj[node].items()))
+    sim.event_queue.post(Event(sim.get_time() + 1, EVENT_TYPE.CHANGE_LINK, sim, node, neighbor, latency * 2 + 1))
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim.dispatch_event("NO_STOP")
+    if sim.user_path_caches()[0] is caches[0]:
+        print("caches of the old forwarding state kept after CHANGE_LINK %s %s" % (node, neighbor), file=sys.stderr)
+        sys.exit(1)
+    after = check(sim, "after CHANGE_LINK %s %s" % (node, neighbor))
+
+    print(json.dumps({"event": args.event, "algorithm": args.algorithm, "before": before, "after": after}))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,89 @@
 from simulator.node import Node
-import json
-import copy
+import struct
+
+np = None # NumPy, imported by the first Distance_Vector_Node so that other algorithms never load it, see load_numpy
+
+
+# Cost of a destination without a route, the largest value an int32 vector entry holds
+UNREACHABLE = 2 ** 31 - 1
+
+# Routing message types, see Vector_Codec
+MESSAGE_TYPE = ["update", "full", "resync"]
+
+
+def load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("DISTANCE_VECTOR needs NumPy, run: pip install --user numpy") from None
+        np = numpy
+
+
+class Vector_Codec:
+    """
+    Distance vector messages as packed arrays: a header of type (index in
+    MESSAGE_TYPE, i32), sender (i32) and seq (i64), then count int32 destination
+    ids followed by their count int32 costs. Decoding hands out NumPy views
+    of the received buffer instead of copies.
+    """
+
+    name = "vector"
+    header = struct.Struct('<iiq')
+
+    def encode(self, message):
+        ids, costs = message.get('ids'), message.get('costs')
+        m = self.header.pack(MESSAGE_TYPE.index(message['type']), message['sender'], message.get('seq', 0))
+        if ids is None:
+            return m
+        return m + ids.astype(np.int32).tobytes() + costs.astype(np.int32).tobytes()
+
+    def decode(self, m):
+        type, sender, seq = self.header.unpack_from(m)
+        count = (len(m) - self.header.size) // 8
+        return {
+            'type': MESSAGE_TYPE[type],
+            'sender': sender,
+            'seq': seq,
+            'ids': np.frombuffer(m, dtype=np.int32, count=count, offset=self.header.size),
+            'costs': np.frombuffer(m, dtype=np.int32, count=count, offset=self.header.size + 4 * count)
+        }
+
 
 class Distance_Vector_Node(Node):
+    codec = Vector_Codec()
+    update_window = 1 # seconds a triggered update waits for later changes to ride along, 0 sends each one at once
+    poison_reverse = True # advertise each route to its own next hop as unreachable (split horizon with poison reverse)
+    hold_down = 30 # seconds a destination whose route was lost stays unreachable, 0 for no hold-down; must outlast
+                   # the bad news going round a loop of nodes, or the loop counts to infinity once it ends
+    max_metric = None # costs from this on count as unreachable, None for no cutoff below UNREACHABLE
+
     def __init__(self, id):
         super().__init__(id)
-        self.distance_vector = {} # { dest: cost } 
-        self.neighbors_dict = {} # { direct_neighbor: (cost, next_hop)}
-        self.seen = {} # Tracking sequence numbers { dest: seq }
-        self.sequence_number = 0
- 
+        load_numpy()
+        self.table = Distance_Table(id, self.max_metric or UNREACHABLE, self.poison_reverse)
+        self.last_seq = {} # { neighbor: seq of the newest vector applied from it }, once its full vector arrived
+        self.full = set() # neighbors owed the whole vector at the next advertisement
+        self.update_pending = False # an 'update' timer is set, see trigger
+
     # Return a string
     def __str__(self):
         """
         Prints represenation of node state for debugging purposes,
         not strictly necessary to implement but helpful
-        
+
         Parameters:
         None
 
         Returns:
         state (str): representation of node state
-        
+
         """
-        return "Rewrite this function to define your node dump printout"
+        table = self.table
+        routes = {int(d): (int(table.dist[d]), table.row_ids[table.hop[d]])
+                  for d in np.flatnonzero(table.hop >= 0)}
+        return f"Node {self.id} distance vector {{ dest: (cost, next_hop) }}: {routes}"
 
     # Called to inform Node that outgoing link properties have changed
     def link_has_been_updated(self, neighbor, latency):
@@ -38,19 +98,20 @@ class Distance_Vector_Node(Node):
         Returns:
         None
         """
-
+        table = self.table
+        full = ()
         if latency == -1:
-            self.neighbors_dict[neighbor] = latency # Set to -1
+            self.last_seq.pop(neighbor, None)
+            table.remove_neighbor(neighbor)
+        elif neighbor in table.row_of:
+            table.set_cost(neighbor, latency)
         else:
-            # New node... Add it to the distance vector and neighbors dict
-            if neighbor not in self.neighbors_dict:
-                self.distance_vector[neighbor] = (latency, neighbor)
-            self.neighbors_dict[neighbor] = latency
-
-        # Calculate Bellman-Ford algorithm. If DV changes, forward to neighbors.
-
-                    
+            # A new adjacency gets our whole vector, everyone else only what changed
+            table.add_neighbor(neighbor, latency)
+            full = (neighbor,)
 
+        self.relax()
+        self.trigger(full)
 
     def process_incoming_routing_message(self, m):
         """
@@ -58,53 +119,331 @@ class Distance_Vector_Node(Node):
         neighbor(s) and/or updating tables
 
         Parameters:
-        m (str): routing message
+        m (str): routing message, as produced by self.codec
+
+        Returns:
+        None
+
+        """
+        self.process_incoming_routing_messages([m])
+
+    def process_incoming_routing_messages(self, messages):
+        """
+        Applies every vector that arrived in the same second to the neighbors' rows,
+        then relaxes the destinations they mention in one step and triggers a
+        single update for whatever changed.
+
+        A message overtaken by a later one from the same neighbor (its link got
+        faster while it was in flight) cannot be applied in order, so the neighbor
+        is asked to resend its whole vector instead.
+
+        Parameters:
+        messages (list): routing messages, as produced by self.codec
 
         Returns:
         None
-        
+
         """
-        message = json.loads(m)
-        print("Received message:", message)
+        table = self.table
+        full = set()
+        for m in messages:
+            message = self.decode_message(m)
+            sender = message['sender']
+            if sender not in table.row_of:
+                continue # sent over a link that has gone down since
+
+            if message['type'] == 'resync':
+                full.add(sender)
+                continue
+
+            seq = message['seq']
+            last = self.last_seq.get(sender)
+            ids, costs = message['ids'], message['costs']
+            if message['type'] == 'full':
+                if last is None or seq > last:
+                    table.replace_row(sender, ids, costs)
+                    self.last_seq[sender] = seq
+            elif last is not None and seq > last:
+                table.update_row(sender, ids, costs)
+                self.last_seq[sender] = seq
+            else:
+                self.send_to_neighbor(sender, self.encode_message({'type': 'resync', 'sender': self.id}))
 
-        neighbor = message['neighbor']
-        neighbor_dv = message['neighbor_dv']
-        seq = self.sequence_number
+        self.relax()
+        self.trigger(full)
 
-        if neighbor in self.seen:
-            if seq <= self.seen[neighbor]:
-                return  
-        
-        # New message!
-        self.seen[neighbor] = seq  
+    def timer_expired(self, tag):
+        """
+        Sends the update held back by the update window, or ends the hold-down
+        of every destination whose time is up.
 
-        # Calculate Bellman-Ford algorithm. If DV changes, send to neighbors
-                
-            
-    def bellman_ford(self):
-        pass
+        Parameters:
+        tag (str): 'update' or 'release', as passed to set_timer
+
+        Returns:
+        None
+
+        """
+        if tag == 'update':
+            self.update_pending = False
+            self.advertise()
+        else:
+            self.table.release(self.get_time())
+            self.relax()
+            self.trigger()
+
+    def relax(self):
+        """
+        Relaxes the dirty destinations and, with hold_down, puts every one whose
+        route was lost (see Distance_Table.relax) in hold-down: it is advertised
+        as unreachable and ignores what the neighbors say until the hold-down
+        ends, so a route that went away is flushed from every neighbor instead of
+        counted to infinity. A route that got dearer while a neighbor stayed
+        feasible is kept.
+
+        Parameters:
+        None
+
+        Returns:
+        None
+
+        """
+        lost = self.table.relax()
+        if self.hold_down and lost.size:
+            self.table.hold(lost, self.get_time() + self.hold_down)
+            self.set_timer(self.hold_down, 'release')
+
+    def trigger(self, full=()):
+        """
+        Advertises what changed, at once or, with update_window, once the window
+        that the first change opened is over, merging every change made meanwhile.
+
+        Parameters:
+        full (iterable): neighbors that get the whole vector
+
+        Returns:
+        None
+
+        """
+        self.full.update(full)
+        if not self.update_window:
+            self.advertise()
+        elif not self.update_pending and (self.full or self.table.changed.any()):
+            self.update_pending = True
+            self.set_timer(self.update_window, 'update')
+
+    def advertise(self):
+        """
+        Sends the destinations whose cost changed since the last advertisement to
+        every neighbor, and the whole vector to the neighbors in self.full. With
+        poison_reverse, routes through a neighbor go to it as unreachable.
+
+        Parameters:
+        None
+
+        Returns:
+        None
+
+        """
+        table = self.table
+        changed = table.take_changed()
+        full, self.full = self.full, set()
+        update = None
+        for r, neighbor in enumerate(table.row_ids):
+            if neighbor in full:
+                reachable = table.dist < UNREACHABLE
+                if self.poison_reverse:
+                    reachable &= table.hop != r
+                ids = np.flatnonzero(reachable)
+                self.send_to_neighbor(neighbor, self.vector_message('full', ids, table.dist[ids]))
+            elif changed.size:
+                if self.poison_reverse:
+                    poisoned = table.hop[changed] == r
+                    if poisoned.any():
+                        costs = table.dist[changed]
+                        costs[poisoned] = UNREACHABLE
+                        self.send_to_neighbor(neighbor, self.vector_message('update', changed, costs))
+                        continue
+                if update is None:
+                    update = self.vector_message('update', changed, table.dist[changed])
+                self.send_to_neighbor(neighbor, update)
+
+    def vector_message(self, type, ids, costs):
+        return self.encode_message({'type': type, 'sender': self.id, 'seq': next(self.topology.sequence),
+                                    'ids': ids, 'costs': costs})
 
     # Return a neighbor, -1 if no path to destination
     def get_next_hop(self, destination):
         """
         Node is asked which hop it THINKS is next on path to destination
-        
+
         Parameters:
         destination (Node): final destination being searched for
-        
+
         Returns:
         hops (int): next Node to reach destination
-        
+
+        """
+        table = self.table
+        if not 0 <= destination < table.dist.size or table.hop[destination] < 0:
+            return -1
+        return table.row_ids[table.hop[destination]]
+
+
+class Distance_Table:
+    """
+    A node's distance vector and the vectors last heard from its neighbors, as
+    NumPy arrays with one column per destination. Columns are indexed by node id,
+    which the event files keep dense, and the arrays grow as higher ids show up.
+
+    rows[r] is the vector of neighbor row_ids[r] and cost[r] the latency of the
+    link to it, so the best route to every destination in a set of columns is one
+    vectorized step, min over r of cost[r] + rows[r, columns]. Updates only mark
+    their columns dirty; relax() then recomputes just those.
+
+    Costs from max_metric on count as unreachable. With track_hops, a column also
+    counts as changed when only its next hop changed, which matters to neighbors
+    that get routes through themselves poisoned.
+    """
+
+    def __init__(self, id, max_metric=UNREACHABLE, track_hops=False):
+        self.id = id
+        self.max_metric = max_metric
+        self.track_hops = track_hops
+        self.row_ids = [] # neighbor of each row
+        self.row_of = {} # { neighbor: row }
+        self.cost = np.zeros(0, dtype=np.int64) # latency of the link to each row's neighbor
+        self.rows = np.zeros((0, 0), dtype=np.int32) # rows[r, d]: cost from row r's neighbor to d, as it advertised
+        self.dist = np.zeros(0, dtype=np.int32) # dist[d]: our cost to d, UNREACHABLE without a route
+        self.hop = np.zeros(0, dtype=np.int16) # hop[d]: row of the next hop to d, -1 without a route
+        self.changed = np.zeros(0, dtype=bool) # columns whose cost changed since take_changed
+        self.held = {} # { column: time its hold-down ends }, few at a time so not an array
+        self.dirty = [] # arrays of columns relax() has to recompute
+        self.grow(id)
+        self.dist[id] = 0
+
+    def grow(self, id):
+        """Makes room for columns up to id, by at least a quarter so growing stays amortized O(1)."""
+        size = self.dist.size
+        if id < size:
+            return
+        new = max(id + 1, size + size // 4)
+        self.dist = np.concatenate((self.dist, np.full(new - size, UNREACHABLE, dtype=np.int32)))
+        self.hop = np.concatenate((self.hop, np.full(new - size, -1, dtype=np.int16)))
+        self.changed = np.concatenate((self.changed, np.zeros(new - size, dtype=bool)))
+        rows = np.full((len(self.row_ids), new), UNREACHABLE, dtype=np.int32)
+        rows[:, :size] = self.rows
+        self.rows = rows
+
+    def add_neighbor(self, neighbor, latency):
+        self.grow(neighbor)
+        row = np.full((1, self.dist.size), UNREACHABLE, dtype=np.int32)
+        row[0, neighbor] = 0
+        self.rows = np.vstack((self.rows, row))
+        self.cost = np.append(self.cost, latency)
+        self.row_of[neighbor] = len(self.row_ids)
+        self.row_ids.append(neighbor)
+        self.dirty.append(np.array([neighbor]))
+
+    def remove_neighbor(self, neighbor):
+        r = self.row_of.pop(neighbor, None)
+        if r is None:
+            return
+        del self.row_ids[r]
+        self.row_of = {n: i for i, n in enumerate(self.row_ids)}
+        self.rows = np.delete(self.rows, r, axis=0)
+        self.cost = np.delete(self.cost, r)
+        # Routes through the neighbor are lost, the rows after it move up one
+        lost = np.flatnonzero(self.hop == r)
+        self.hop[self.hop > r] -= 1
+        self.hop[lost] = -1
+        self.dirty.append(lost)
+
+    def set_cost(self, neighbor, latency):
+        r = self.row_of[neighbor]
+        self.cost[r] = latency
+        self.dirty.append(np.flatnonzero((self.rows[r] < UNREACHABLE) | (self.hop == r)))
+
+    def update_row(self, neighbor, ids, costs):
+        """Applies the entries a neighbor advertised, ids in ascending order."""
+        if ids.size:
+            self.grow(int(ids[-1]))
+            self.rows[self.row_of[neighbor], ids] = costs
+            self.dirty.append(ids)
+
+    def replace_row(self, neighbor, ids, costs):
+        """Replaces a neighbor's row with its whole vector."""
+        r = self.row_of[neighbor]
+        self.dirty.append(np.flatnonzero(self.rows[r] < UNREACHABLE))
+        self.rows[r] = UNREACHABLE
+        self.rows[r, neighbor] = 0
+        self.update_row(neighbor, ids, costs)
+
+    def relax(self):
         """
-        print("NEXT HOP")
-        print(self.distance_vector)
-        print(self.id)
-        print(destination)
-        if destination in self.distance_vector:
-            _, next_hop = self.distance_vector[destination]
-            return next_hop
-        return -1
+        Recomputes the cost and next hop of every dirty column that is not held
+        down, marking those that changed. Returns the columns whose route was lost:
+        those that became unreachable, and those that got dearer while no neighbor
+        is feasible, that is, advertises a cost below our old one. Any other
+        neighbor may be routing through us on stale news, the old next hop too
+        once its own cost has climbed past ours, as it does counting to infinity.
+        """
+        if not self.dirty:
+            return np.zeros(0, dtype=np.intp)
+        # A column listed twice gets the same result twice, cheaper than deduplicating
+        columns = self.dirty[0] if len(self.dirty) == 1 else np.concatenate(self.dirty)
+        self.dirty = []
+        keep = columns != self.id
+        if self.held:
+            keep &= ~np.isin(columns, np.fromiter(self.held, dtype=np.intp, count=len(self.held)))
+        columns = columns[keep]
+        if columns.size == 0:
+            return columns
+
+        if self.row_ids:
+            totals = self.cost[:, None] + self.rows[:, columns] # int64, no overflow past UNREACHABLE
+            hop = totals.argmin(axis=0)
+            dist = totals.min(axis=0)
+            unreachable = dist >= self.max_metric
+            dist[unreachable] = UNREACHABLE
+            hop[unreachable] = -1
+        else:
+            dist = np.full(columns.size, UNREACHABLE)
+            hop = np.full(columns.size, -1)
+
+        old = self.dist[columns]
+        old_hop = self.hop[columns]
+        lost = dist > old
+        if lost.any():
+            # A route that got worse is kept while some neighbor, the old next hop after a link cost
+            # increase included, advertises a cost below our old one and so cannot be routing through us
+            worse = np.flatnonzero(lost & (dist < UNREACHABLE))
+            lost[worse[(self.rows[:, columns[worse]] < old[worse]).any(axis=0)]] = False
+
+        changed = dist != old
+        if self.track_hops:
+            changed |= hop != old_hop
+        self.changed[columns[changed]] = True
+        self.dist[columns] = dist
+        self.hop[columns] = hop
+        return columns[lost]
 
-        
+    def hold(self, columns, until):
+        """Makes columns unreachable until the given time, whatever the neighbors advertise."""
+        self.held.update(dict.fromkeys(columns.tolist(), until))
+        self.dist[columns] = UNREACHABLE
+        self.hop[columns] = -1
+        self.changed[columns] = True
 
+    def release(self, now):
+        """Ends every hold-down due by now, leaving its columns dirty."""
+        due = [column for column, until in self.held.items() if until <= now]
+        for column in due:
+            del self.held[column]
+        self.dirty.append(np.array(due, dtype=np.intp))
 
+    def take_changed(self):
+        """Returns the columns whose cost changed since the last call."""
+        columns = np.flatnonzero(self.changed)
+        self.changed[columns] = False
+        return columns
@@ -1,138 +1,165 @@
 import argparse
 import datetime
+import heapq
+import itertools
 import math
 import random
 
+from simulator.config import EVENT_TYPE
+from simulator.event_file import open_writer
 
 MAX_LATENCY = 10
 
+# Every random choice of the generator comes from here, so --seed makes a run reproducible
+rng = random.Random()
+
+# Link changes are a poisson process: each second one happens with this probability,
+# so the time between them is roughly 10 * MAX_LATENCY
+CHANGE_PROBABILITY = 1.0 / (10 * MAX_LATENCY + 1)
+
 
 def random_weight():
-    return random.randint(1, MAX_LATENCY)
+    return rng.randint(1, MAX_LATENCY)
+
+
+def next_change(t, probability=CHANGE_PROBABILITY):
+    """
+    Returns the first second after t at which a change happens, if one happens
+    each second with the given probability. The gap is drawn directly instead
+    of testing the probability once per second.
+    """
+    if probability >= 1:
+        return t + 1
+    return t + 1 + int(math.log(1.0 - rng.random()) / math.log(1.0 - probability))
+
+
+class Link_Set:
+    """
+    The links of the generated topology as (node1, node2, latency) tuples, indexed
+    by their endpoints: lookup, add, remove and random choice are O(1), and
+    removing a node costs its degree.
+    """
+
+    def __init__(self):
+        self.links = [] # in no particular order, for rng.choice
+        self.position = {} # { (min, max) endpoints: index in links }
+        self.adj = {} # { node: set of neighbors }
+
+    def __len__(self):
+        return len(self.links)
+
+    def __iter__(self):
+        return iter(self.links)
+
+    def has(self, node1, node2):
+        return node2 in self.adj.get(node1, ())
+
+    def add(self, link):
+        self.position[key(link[0], link[1])] = len(self.links)
+        self.links.append(link)
+        self.adj.setdefault(link[0], set()).add(link[1])
+        self.adj.setdefault(link[1], set()).add(link[0])
+
+    def remove(self, link):
+        # Move the last link into the hole, so removal is O(1)
+        i = self.position.pop(key(link[0], link[1]))
+        last = self.links.pop()
+        if i < len(self.links):
+            self.links[i] = last
+            self.position[key(last[0], last[1])] = i
+        self.adj[link[0]].discard(link[1])
+        self.adj[link[1]].discard(link[0])
+
+    def remove_node(self, node):
+        for neighbor in list(self.adj.get(node, ())):
+            self.remove(self.links[self.position[key(node, neighbor)]])
+        self.adj.pop(node, None)
+
+    def choice(self):
+        return rng.choice(self.links)
+
+
+def key(node1, node2):
+    return (node1, node2) if node1 < node2 else (node2, node1)
 
 
 def del_node(links, removed, file, link_time, node, time):
-    change = random.randint(0, 100)
+    change = rng.randint(0, 100)
     if change <= 5:
-        for t in range(link_time + 1, time):
-            # link change events are a poisson process.
-            # we want the time between events to be roughly 10 * MAX_LATENCY
-            if 0 == random.randint(0, 10 * MAX_LATENCY):
-                if len(links) > 0:
-                    removed.append(node)
-                    file.write("{} DELETE_NODE {}\n".format(link_time + 1, node))
-                    temp = []
-                    for l in links:
-                        if not (l[0] == node or l[1] == node):
-                            temp.append(l)
-                    links.clear()
-                    links.extend(temp)
-                    return -1, t + 1
-                break
+        t = next_change(link_time)
+        if t < time and len(links) > 0:
+            removed.add(node)
+            file.command(link_time + 1, EVENT_TYPE.DELETE_NODE, node)
+            links.remove_node(node)
+            return -1, t + 1
     return 1, link_time
 
 
 def del_link(links, file, link_time, time):
-    change = random.randint(0, 100)
+    change = rng.randint(0, 100)
     if change <= 10:
-        for t in range(link_time + 1, time):
-            # link change events are a poisson process.
-            # we want the time between events to be roughly 10 * MAX_LATENCY
-            if 0 == random.randint(0, 10 * MAX_LATENCY):
-                if len(links) > 0:
-                    link_rem = random.choice(links)
-                    links.remove(link_rem)
-                    file.write("%d DELETE_LINK %d %d\n" % (link_time + 1, link_rem[0], link_rem[1]))
-                    return t + 1
-                break
+        t = next_change(link_time)
+        if t < time and len(links) > 0:
+            link_rem = links.choice()
+            links.remove(link_rem)
+            file.command(link_time + 1, EVENT_TYPE.DELETE_LINK, link_rem[0], link_rem[1])
+            return t + 1
     return link_time
 
 
-# It appears CHANGE_NODE is not used anymore
-def change_node(n, node, file, links):
-    change = random.randint(0, 100)
-    if change <= 10:
-        if node >= n:
-            new_i = node + 1
-        else:
-            new_i = n
-        file.write("0 CHANGE_NODE {} {}\n".format(node, new_i))
-        for l in links:
-            new_l = l
-            if l[0] == node:
-                new_l = (new_i, l[1], l[2])
-            elif l[1] == node:
-                new_l = (l[0], new_i, l[2])
-
-            links.remove(l)
-            links.append(new_l)
-        return new_i
-    return node
-
-
 def add_node(removed, link_time, file, nxt):
-    change = random.randint(0, 100)
+    change = rng.randint(0, 100)
     if change <= 20:
         # They won't be testing reusing a node
-
-        # if change <= 10 and len(removed) > 0:
-        #     node = random.choice(removed)
-        #     removed.remove(node)
-        # else:
         node = nxt
         nxt += 1
-        file.write("{} ADD_NODE {}\n".format(link_time, node))
+        file.command(link_time, EVENT_TYPE.ADD_NODE, node)
     return nxt
 
 
 def add_link(n, src, removed, links, link_time, file):
-    neighbor = None
-    timeout = 20
-    count = 0
-    while True:
-        while neighbor is None:
-            offset = int(math.floor(math.log(n,2)))
-            val = random.randint(max(0, src - offset), min(n - 1, src + offset))
-            if val not in removed:
-                neighbor = val
-        if src in removed:
-            stop = 0
-        link = (src, neighbor, random_weight())
-        already_exists = any([(l[0] == src and l[1] == neighbor) or (l[0] == neighbor and l[1] == src) for l in links])
-        if already_exists or src == neighbor:
-            count += 1
-            if count >= timeout:
-                return link_time
-            continue
-        links.extend([link])
-        file.write("%d ADD_LINK %d %d %d\n" % ((link_time,) + link))
-        link_time += 1
-        break
-    return link_time
-
-
-def bfs(links, islands, nodes):
-    while len(nodes) > 0:
-        curr = next(iter(nodes))
-        queue = [curr]
-        island = set([])
-        while len(queue) > 0:
-            curr = queue.pop(0)
-            island.add(curr)
-            if curr in nodes:
-                nodes.remove(curr)
-                for i in links:
-                    if curr == i[0]:
-                        queue.append(i[1])
-                    elif curr == i[1]:
-                        queue.append(i[0])
-        islands.add(tuple(island))
-    return islands
-
-
-
-
-def generate_simulation(n, degree, time, filename):
+    offset = int(math.floor(math.log(n, 2)))
+    for _ in range(20):
+        neighbor = rng.randint(max(0, src - offset), min(n - 1, src + offset))
+        if neighbor not in removed:
+            break
+    else:
+        return link_time
+    # One candidate only: giving up when it is taken keeps the link churn as it always was
+    if neighbor == src or links.has(src, neighbor):
+        return link_time
+    link = (src, neighbor, random_weight())
+    links.add(link)
+    file.command(link_time, EVENT_TYPE.ADD_LINK, *link)
+    return link_time + 1
+
+
+def islands(links, nodes):
+    """
+    Returns one node of each connected component of nodes, found with union-find
+    over links.
+    """
+    parent = {node: node for node in nodes}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for node1, node2, latency in links:
+        root1, root2 = find(node1), find(node2)
+        if root1 != root2:
+            parent[max(root1, root2)] = min(root1, root2)
+    return [node for node in nodes if find(node) == node]
+
+
+def write_locality(file, n, degree, time, events):
+    """
+    The original model: nodes favor neighbors with nearby indexes, and links and
+    nodes are added, changed and deleted along the way. Returns the nodes left
+    and the time the last change was written.
+    """
     n *= 1.5
     n = int(n)
     nxt = n + 1
@@ -140,105 +167,376 @@ def generate_simulation(n, degree, time, filename):
     if degree > math.log(n,2)-1:
         raise Exception("Degree must be smaller than log(n) where n is the number of nodes.")
 
-    links = []
-    removed = []
+    links = Link_Set()
+    removed = set()
 
-    print("writing %s.event" % filename)
     link_time = 1
-    with open("%s.event" % filename, "w") as file:
-        # create nodes
-        for i in range(n):
-            file.write("0 ADD_NODE %d\n" % i)
-        # create random edges for each node
-        for i in range(n):
-            # don't make links truly random, favor nodes with nearby indexes
+    # create nodes
+    for i in range(n):
+        file.command(0, EVENT_TYPE.ADD_NODE, i)
+    # create random edges for each node
+    for i in range(n):
+        # don't make links truly random, favor nodes with nearby indexes
+
+        res, link_time = del_node(links, removed, file, link_time, i, time)
+        if res == -1:
+            continue
+
+        possible_neighbors = []
+        for j in range(int(math.floor(math.log(n,2)))):
+            offset = 1<<j
+            offset *= 1.5
+            offset = int(offset)
+            for neighbor in [i+offset, i-offset]:
+                if neighbor >= 0 and neighbor < n and neighbor not in removed and not links.has(i, neighbor):
+                    possible_neighbors.append(neighbor)
+        # choose random links
+        for j in range(min(degree, len(possible_neighbors))):
+            if link_time > time // 2:
+                break
+
+            neighbor = possible_neighbors.pop(rng.randrange(len(possible_neighbors)))
+
+            link_time = del_link(links, file, link_time, time)
+
+            link = (i, neighbor, random_weight())
+            links.add(link)
+            file.command(link_time, EVENT_TYPE.ADD_LINK, *link)
+            link_time += 1
+            # above, we actually create links at different times just in case they are duplicated
 
             res, link_time = del_node(links, removed, file, link_time, i, time)
             if res == -1:
-                continue
+                break
 
-            possible_neighbors = []
-            for j in range(int(math.floor(math.log(n,2)))):
-                offset = 1<<j
-                offset *= 1.5
-                offset = int(offset)
-                for neighbor in [i+offset, i-offset]:
-                    if neighbor >= 0 and neighbor < n and neighbor not in removed:
-                        already_exists = any([(l[0] == i and l[1] == neighbor) or (l[0] == neighbor and l[1] == i) for l in links])
-                        if not already_exists:
-                            possible_neighbors.append(neighbor)
-            # choose random links
-            for j in range(min(degree, len(possible_neighbors))):
-                if link_time > time // 2:
-                    break
-
-                neighbor = random.choice(possible_neighbors)
-                possible_neighbors.remove(neighbor)
-
-                # i = change_node(n, i, file, links)
-
-                link_time = del_link(links, file, link_time, time)
-
-                if i in removed or neighbor in removed:
-                    stop = 0
-
-                link = (i, neighbor, random_weight())
-                links.extend([link])
-                file.write("%d ADD_LINK %d %d %d\n" % ((link_time,) + link))
-                link_time += 1
-                # above, we actually create links at different times just in case they are duplicated
-
-                res, link_time = del_node(links, removed, file, link_time, i, time)
-                if res == -1:
-                    break
+        if link_time > time // 2:
+            break
 
-            if link_time > time // 2:
+    # change links
+    t = next_change(link_time)
+    while t < time or (events is not None and file.count < events):
+        if len(links) == 0:
+            if t >= time:
+                print("no links left to change after %d events" % file.count)
                 break
-
-        # change links
-        # file.write("%d DRAW_TOPOLOGY\n" % link_time);
-        for t in range(link_time+1, time):
-            # link change events are a poisson process.
-            # we want the time between events to be roughly 10 * MAX_LATENCY
-            if 0 == random.randint(0, 10 * MAX_LATENCY):
-                link_to_change = random.choice(links)
-                links.remove(link_to_change)
-                val = random_weight()
-                file.write("%d CHANGE_LINK %d %d %d\n" %
-                           (t, link_to_change[0], link_to_change[1], val))
-                link = (link_to_change[0], link_to_change[1], val)
-                links.extend([link])
-
-                nxt = add_node(removed, t, file, nxt)
-                add_link(n, link_to_change[0], removed, links, t, file)
-                # change_node(n, link_to_change[1], file, links)
-                del_link(links, file, t, time)
-                del_node(links, removed, file, t, link_to_change[0], time)
-
-            link_time = t + 1
-
-        # CODE TO ENSURE GRAPH IS CONNECTED
-        nodes = set([x for x in range(nxt) if x not in removed])
-        islands = set([])
-        islands = bfs(links, islands, nodes)
-        first = None
-        for ind in islands:
-            if first is None:
-                first = ind[0]
-                continue
-            second = ind[0]
+        else:
+            link_to_change = links.choice()
+            links.remove(link_to_change)
+            val = random_weight()
+            file.command(t, EVENT_TYPE.CHANGE_LINK, link_to_change[0], link_to_change[1], val)
+            link = (link_to_change[0], link_to_change[1], val)
+            links.add(link)
+
+            nxt = add_node(removed, t, file, nxt)
+            add_link(n, link_to_change[0], removed, links, t, file)
+            del_link(links, file, t, time if events is None else math.inf)
+            del_node(links, removed, file, t, link_to_change[0], time if events is None else math.inf)
+        link_time = t + 1
+        t = next_change(t)
+    link_time = max(link_time, time)
+
+    # CODE TO ENSURE GRAPH IS CONNECTED
+    nodes = [x for x in range(nxt) if x not in removed]
+    first = None
+    for second in islands(links, nodes):
+        if first is not None:
             link = (first, second, random_weight())
-            file.write("%d ADD_LINK %d %d %d\n" % ((link_time,) + link))
-            # link_time += 20
-            first = second
-        # CODE TO ENSURE GRAPH IS CONNECTED
+            file.command(link_time, EVENT_TYPE.ADD_LINK, *link)
+        first = second
+    # CODE TO ENSURE GRAPH IS CONNECTED
+    return nodes, link_time
+
+
+# Waxman pairs farther apart than this many times beta * L are skipped; their
+# link probability would be below 0.7% of alpha
+WAXMAN_REACH = 5
+
+
+def waxman(n, degree, beta=None):
+    """
+    Waxman graph: n nodes placed uniformly in the unit square, each pair linked with
+    probability alpha * exp(-d / (beta * L)), L being the diagonal. Only pairs within
+    WAXMAN_REACH * beta * L of each other are tried, found through a grid of cells.
+    beta defaults to the value that puts about 16 * degree nodes within reach, and
+    alpha is chosen for a mean degree of degree. Latency grows with distance.
+    """
+    L = math.sqrt(2)
+    if beta is None:
+        beta = math.sqrt(16 * degree / (math.pi * n)) / (WAXMAN_REACH * L)
+    scale = beta * L
+    reach = WAXMAN_REACH * scale
+    alpha = min(1.0, degree / (2 * math.pi * n * scale * scale *
+                               (1 - math.exp(-WAXMAN_REACH) * (1 + WAXMAN_REACH))))
+
+    position = [(rng.random(), rng.random()) for _ in range(n)]
+    cells = {}
+    for node, (x, y) in enumerate(position):
+        cells.setdefault((int(x / reach), int(y / reach)), []).append(node)
 
-        # file.write("%d DRAW_TOPOLOGY\n" % (link_time + 1000))
+    links = []
+    for node1, (x1, y1) in enumerate(position):
+        cx, cy = int(x1 / reach), int(y1 / reach)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for node2 in cells.get((cx + dx, cy + dy), ()):
+                    if node2 <= node1:
+                        continue
+                    d = math.hypot(x1 - position[node2][0], y1 - position[node2][1])
+                    if d < reach and rng.random() < alpha * math.exp(-d / scale):
+                        links.append((node1, node2, max(1, math.ceil(MAX_LATENCY * d / reach))))
+    return n, links
+
+
+def barabasi_albert(n, degree):
+    """Barabasi-Albert preferential attachment: each new node links to degree existing nodes."""
+    m = max(1, degree)
+    links = []
+    ends = [] # every node once per link it has, so a uniform pick is preferential
+    targets = list(range(m))
+    for source in range(m, n):
+        for target in targets:
+            links.append((source, target, random_weight()))
+        ends.extend(targets)
+        ends.extend([source] * m)
+        chosen = set()
+        while len(chosen) < m:
+            chosen.add(rng.choice(ends))
+        targets = sorted(chosen)
+    return max(n, m), links
+
+
+def grid(n, degree, wrap=False):
+    """A width x height grid with about n nodes, wrapped around into a torus if wrap is set."""
+    width = max(1, round(math.sqrt(n)))
+    height = math.ceil(n / width)
+    links = []
+    for y in range(height):
+        for x in range(width):
+            node = y * width + x
+            if x + 1 < width:
+                links.append((node, node + 1, random_weight()))
+            elif wrap and width > 2:
+                links.append((node, y * width, random_weight()))
+            if y + 1 < height:
+                links.append((node, node + width, random_weight()))
+            elif wrap and height > 2:
+                links.append((node, x, random_weight()))
+    return width * height, links
+
+
+def torus(n, degree):
+    return grid(n, degree, wrap=True)
+
+
+def fat_tree(n, degree):
+    """
+    k-ary fat tree with its hosts, for the smallest even k giving at least n nodes:
+    (k/2)^2 core switches, then k pods of k/2 aggregation and k/2 edge switches,
+    then k/2 hosts under each edge switch.
+    """
+    k = 2
+    while (k ** 3 + 5 * k * k) // 4 < n:
+        k += 2
+    half = k // 2
+    core = half * half
+    pod_size = k
+    hosts = core + k * pod_size
 
-        # print routing results
-        for i in set([x for x in range(nxt) if x not in removed]):
-            file.write("%d DRAW_TREE %d\n" % (10*time, i))
+    links = []
+    for pod in range(k):
+        aggregation = core + pod * pod_size
+        edge = aggregation + half
+        for i in range(half):
+            for j in range(half):
+                links.append((i * half + j, aggregation + i, random_weight()))
+                links.append((aggregation + i, edge + j, random_weight()))
+                links.append((edge + i, hosts + (pod * half + i) * half + j, random_weight()))
+    return hosts + k * half * half, links
+
+
+def ring_of_cliques(n, degree):
+    """Cliques of degree + 1 nodes, each linked to the next one around a ring."""
+    size = max(2, degree + 1)
+    count = max(1, math.ceil(n / size))
+    links = []
+    for c in range(count):
+        first = c * size
+        for i in range(first, first + size):
+            for j in range(i + 1, first + size):
+                links.append((i, j, random_weight()))
+        if count > 1:
+            links.append((first, (c + 1) % count * size + 1, random_weight()))
+    return count * size, links
+
+
+MODELS = {
+    "locality": None, # write_locality
+    "waxman": waxman,
+    "ba": barabasi_albert,
+    "grid": grid,
+    "torus": torus,
+    "fat-tree": fat_tree,
+    "ring-of-cliques": ring_of_cliques
+}
+
+CHURN = ["flaps", "failures", "outages"]
+
+
+class Random_Set:
+    """A set with O(1) add, remove and uniform random choice."""
+
+    def __init__(self, items=()):
+        self.items = []
+        self.position = {}
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def add(self, item):
+        if item not in self.position:
+            self.position[item] = len(self.items)
+            self.items.append(item)
+
+    def remove(self, item):
+        i = self.position.pop(item)
+        last = self.items.pop()
+        if i < len(self.items):
+            self.items[i] = last
+            self.position[last] = i
+
+    def choice(self):
+        return rng.choice(self.items)
+
+
+def write_model(file, model, n, degree, time, events, churn, rate, downtime, radius, beta=None):
+    """
+    Builds a MODELS topology at time 0, joining its components if it has several,
+    then applies the churn models as one Poisson process with the given probability
+    per second, picking a model at random for each event:
+        flaps - a random link goes down
+        failures - a random node goes down
+        outages - a random node and everything within radius hops of it go down
+    Whatever went down comes back after an exponentially distributed downtime.
+    Events are written in time order; only the pending recoveries are kept.
+    Returns the nodes and the time the last change was written.
+    """
+    if model == "waxman":
+        count, links = waxman(n, degree, beta)
+    else:
+        count, links = MODELS[model](n, degree)
+    first = None
+    for second in islands(links, range(count)):
+        if first is not None:
+            links.append((first, second, random_weight()))
+        first = second
+    print("%s: %d nodes, %d links" % (model, count, len(links)))
+
+    adj = [[] for _ in range(count)] # the full topology, { node: [(neighbor, latency)] }
+    up_links = Link_Set()
+    for node in range(count):
+        file.command(0, EVENT_TYPE.ADD_NODE, node)
+    for link in links:
+        file.command(0, EVENT_TYPE.ADD_LINK, *link)
+        up_links.add(link)
+        adj[link[0]].append((link[1], link[2]))
+        adj[link[1]].append((link[0], link[2]))
+    del links
+    up_nodes = Random_Set(range(count))
+    flapped = set() # endpoints of the links that are down by themselves
+    recoveries = [] # heap of (time, seq, link or list of nodes)
+    seq = itertools.count()
+    last_time = 0
+
+    def recover(until):
+        nonlocal last_time
+        while recoveries and recoveries[0][0] <= until:
+            t, _, item = heapq.heappop(recoveries)
+            last_time = max(last_time, t)
+            if isinstance(item, tuple):
+                flapped.discard(key(item[0], item[1]))
+                if item[0] in up_nodes and item[1] in up_nodes:
+                    file.command(t, EVENT_TYPE.ADD_LINK, *item)
+                    up_links.add(item)
+                continue
+            for node in item:
+                file.command(t, EVENT_TYPE.ADD_NODE, node)
+                up_nodes.add(node)
+            for node in item:
+                for neighbor, latency in adj[node]:
+                    if neighbor in up_nodes and key(node, neighbor) not in flapped and not up_links.has(node, neighbor):
+                        file.command(t, EVENT_TYPE.ADD_LINK, node, neighbor, latency)
+                        up_links.add((node, neighbor, latency))
+
+    def fail(t, nodes):
+        for node in nodes:
+            file.command(t, EVENT_TYPE.DELETE_NODE, node)
+            up_nodes.remove(node)
+            up_links.remove_node(node)
+        heapq.heappush(recoveries, (t + down_for(), next(seq), nodes))
+
+    def down_for():
+        return max(1, int(rng.expovariate(1.0 / downtime)))
+
+    t = next_change(0, rate)
+    while churn and (t < time or (events is not None and file.count < events)):
+        recover(t)
+        last_time = t
+        kind = rng.choice(churn)
+        if kind == "flaps" and len(up_links) > 0:
+            link = up_links.choice()
+            up_links.remove(link)
+            flapped.add(key(link[0], link[1]))
+            file.command(t, EVENT_TYPE.DELETE_LINK, link[0], link[1])
+            heapq.heappush(recoveries, (t + down_for(), next(seq), link))
+        elif kind == "failures" and len(up_nodes) > 0:
+            fail(t, [up_nodes.choice()])
+        elif kind == "outages" and len(up_nodes) > 0:
+            center = up_nodes.choice()
+            region = [center]
+            seen = {center}
+            frontier = [center]
+            for _ in range(radius):
+                frontier = [neighbor for node in frontier for neighbor, latency in adj[node]
+                            if neighbor in up_nodes and neighbor not in seen and not seen.add(neighbor)]
+                region.extend(frontier)
+            fail(t, region)
+        t = next_change(t, rate)
+    recover(math.inf)
+    return list(range(count)), max(time, last_time)
+
+
+def generate_simulation(n, degree, time, filename, trace=False, events=None, model="locality",
+                        churn=("flaps",), rate=CHANGE_PROBABILITY, downtime=10 * MAX_LATENCY, radius=1,
+                        beta=None, seed=None, draws=None):
+    """
+    Writes a random simulation to filename.event, or filename.trace if trace is set.
+    With events, changes go on past time until about that many events are written.
+    The locality model has its own churn; churn, rate, downtime and radius apply to
+    the other MODELS. Every node's tree is drawn at the end, or draws of them.
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(1 << 32)
+    print("seed %d" % seed)
+    rng.seed(seed)
+
+    filename = "%s.%s" % (filename, "trace" if trace else "event")
+    print("writing %s" % filename)
+    with open_writer(filename, trace) as file:
+        if model == "locality":
+            nodes, end = write_locality(file, n, degree, time, events)
+        else:
+            nodes, end = write_model(file, model, n, degree, time, events, list(churn), rate, downtime, radius, beta)
 
+        # print routing results
+        if draws is not None and draws < len(nodes):
+            nodes = sorted(rng.sample(nodes, draws))
+        for i in nodes:
+            file.command(10*end, EVENT_TYPE.DRAW_TREE, i)
 
 if __name__ == "__main__":
     current_time = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S-%f')
@@ -250,8 +548,34 @@ if __name__ == "__main__":
                         default=3, help='number of edges connected to each node')
     parser.add_argument('--time', dest='time', action='store',
                         default=1000, help='time, in seconds, to run the simulation')
+    parser.add_argument('--events', dest='events', action='store',
+                        default=None, help='keep changing the topology past --time until about this many events are written')
     parser.add_argument('--out', dest='filename', action='store',
                         default=current_time, help='output filename prefix')
+    parser.add_argument('--trace', dest='trace', action='store_true',
+                        help='write a binary event trace (.trace) instead of a .event file')
+    parser.add_argument('--seed', dest='seed', action='store',
+                        default=None, help='seed of every random choice; a fresh one is printed if not given')
+    parser.add_argument('--model', dest='model', action='store', choices=list(MODELS),
+                        default='locality', help='topology model')
+    parser.add_argument('--churn', dest='churn', action='store', nargs='*', choices=CHURN,
+                        default=['flaps'], help='churn models, for every topology model but locality')
+    parser.add_argument('--rate', dest='rate', action='store',
+                        default=CHANGE_PROBABILITY, help='probability of a churn event each second')
+    parser.add_argument('--downtime', dest='downtime', action='store',
+                        default=10 * MAX_LATENCY, help='mean seconds a link or node stays down')
+    parser.add_argument('--radius', dest='radius', action='store',
+                        default=1, help='hops around its center an outage takes down')
+    parser.add_argument('--beta', dest='beta', action='store',
+                        default=None, help='Waxman beta, by default chosen from --nodes and --degree')
+    parser.add_argument('--draws', dest='draws', action='store',
+                        default=None, help='draw the trees of this many random nodes instead of all of them')
     args = parser.parse_args()
     generate_simulation(n=int(args.n), degree=int(args.degree), time=int(args.time),
-                        filename=args.filename)
+                        filename=args.filename, trace=args.trace,
+                        events=int(args.events) if args.events is not None else None,
+                        model=args.model, churn=args.churn, rate=float(args.rate),
+                        downtime=float(args.downtime), radius=int(args.radius),
+                        beta=float(args.beta) if args.beta is not None else None,
+                        seed=int(args.seed) if args.seed is not None else None,
+                        draws=int(args.draws) if args.draws is not None else None)
@@ -1,16 +1,23 @@
-from simulator.node import Node
-import json
+from simulator.node import Node, Binary_Codec
 import heapq
 from collections import defaultdict
 
 
 class Link_State_Node(Node):
+    codec = Binary_Codec()
+    incremental_spf = True # repair the shortest path tree per link change instead of rerunning Dijkstra
+    verify_incremental_spf = False # check every incremental repair against a full recompute (slow)
+
     def __init__(self, id):
         super().__init__(id)
         # self.neighbors is defined inside the Node class in simulator/Node.py
         self.world_representation = defaultdict(lambda: defaultdict(int)) # { id1: {id2: cost}, ...}
-        self.seen = {} # { neighbor: max_sequence_seen_as_int }
+        self.link_costs = {} # { neighbor: latency } for this node's own live links
+        self.lsdb = {} # { origin: (seq, {neighbor: cost}) }, one LSA per router
         self.sequence_number = 0
+        self.forwarding_table = {} # { destination: next_hop }
+        self.forwarding_table_dirty = True # set whenever world_representation changes
+        self.spt = None # Shortest_Path_Tree, only used when incremental_spf is on
 
     # Return a string
     def __str__(self):
@@ -44,47 +51,25 @@ class Link_State_Node(Node):
         """
         print("link_has_been_updated: ", self.id, neighbor, latency)
 
+        new_adjacency = neighbor not in self.link_costs
+
         # If Latency is -1 delete
         if latency == -1:
-            # Update local representation to delete the node completely. 
-            # Send the message with latency -1 to all neighbors. And they should also just delete it. 
-            if self.id in self.world_representation and neighbor in self.world_representation[self.id]:
-                self.world_representation[self.id][neighbor] = latency
-            
-            if neighbor in self.world_representation and self.id in self.world_representation[neighbor]:
-                self.world_representation[neighbor][self.id] = latency
-
-            self.sequence_number += 1
-            message = {
-                'source': self.id,
-                'destination': neighbor,
-                'seq': self.sequence_number,
-                'cost': latency,
-                'neighbors_representation_of_the_world': self.world_representation
-            }
-
-            # Flooding
-            self.send_to_neighbors(json.dumps(message))
-
-
-
+            self.link_costs.pop(neighbor, None)
         else:
-            # print(f"UPDATE BETWEEN {self.id} AND {neighbor} = {latency}")
-            self.world_representation[self.id][neighbor] = latency
-            self.world_representation[neighbor][self.id] = latency
+            self.link_costs[neighbor] = latency
 
-            # Update neighbors on new representation of the world
-            self.sequence_number += 1
-            message = {
-                'source': self.id,
-                'destination': neighbor,
-                'seq': self.sequence_number,
-                'cost': latency,
-                'neighbors_representation_of_the_world': self.world_representation
-            }
+        # Originate a fresh LSA describing only our own links and flood it
+        lsa = self.originate_lsa()
+        self.send_to_neighbors(self.encode_message({'type': 'update', 'lsas': pack_lsas([lsa])}))
 
-            # Flooding
-            self.send_to_neighbors(json.dumps(message))
+        # A new adjacency has to catch up on everything flooded before it existed:
+        # describe our database to the neighbor, it answers with what we are missing
+        if new_adjacency and latency != -1:
+            headers = []
+            for origin, (seq, _) in self.lsdb.items():
+                headers.extend((origin, seq))
+            self.send_to_neighbor(neighbor, self.encode_message({'type': 'dbd', 'sender': self.id, 'headers': headers}))
 
 
     def process_incoming_routing_message(self, m):
@@ -93,76 +78,152 @@ class Link_State_Node(Node):
         neighbor(s) and/or updating tables
 
         Parameters:
-        m (str): routing message
+        m (str): routing message, as produced by self.codec
 
         Returns:
         None
 
         """
+        self.process_incoming_routing_messages([m])
 
-        message = json.loads(m)
-        source = message['source']
-        destination = message['destination']
-        seq = message['seq']
-        cost = message['cost']
-        neighbors_representation_of_the_world = message['neighbors_representation_of_the_world']
+    def process_incoming_routing_messages(self, messages):
+        """
+        Handles every routing message that arrived in the same second, flooding
+        all the LSAs they brought that were new to us in a single update.
 
+        Parameters:
+        messages (list): routing messages, as produced by self.codec
 
-        # If the source has been seen before, then check its set of sequence numbers
-        if source in self.seen:
+        Returns:
+        None
 
-            # If the sequence number has been seen, or the sequence number is less than the max -----> do nothing
-            if seq <= self.seen[source]:
-                return
-            
-            # Handling a deletion
-            if cost == -1:
-                if source in self.world_representation and destination in self.world_representation[source]:
-                    del self.world_representation[source][destination]
-                    self.send_to_neighbors(m)
-                    
-            else:                
-                # Add it to the seen set
-                self.seen[source] = seq
-                
-                # Otherwise this is new. Let's update my own representation and forward this to all neighbors
-                self.world_representation[source][destination] = cost
-                self.world_representation[destination][source] = cost
+        """
+        fresh = []
+        reoriginate = False
+        for m in messages:
+            message = self.decode_message(m)
+
+            if message['type'] == 'dbd':
+                # Database description from a new adjacency: send back every LSA it lacks or has an older copy of
+                headers = message['headers']
+                known = {headers[i]: headers[i + 1] for i in range(0, len(headers), 2)}
+                missing = [(origin, seq, links) for origin, (seq, links) in self.lsdb.items()
+                           if known.get(origin, -1) < seq]
+                if missing:
+                    self.send_to_neighbor(message['sender'], self.encode_message({'type': 'update', 'lsas': pack_lsas(missing)}))
+                continue
 
-                # Flooding to neighbors
-                self.send_to_neighbors(m)
+            # Link state update: install anything newer than what we hold and flood only that onwards
+            for lsa in unpack_lsas(message['lsas']):
+                if lsa[0] == self.id:
+                    # A copy of our own LSA newer than ours was originated before this node was
+                    # deleted and added again: continue numbering above it so ours replaces it
+                    if lsa[1] > self.sequence_number:
+                        self.sequence_number = lsa[1]
+                        reoriginate = True
+                elif self.install_lsa(*lsa):
+                    fresh.append(lsa)
+
+        if reoriginate:
+            fresh.append(self.originate_lsa())
+        if fresh:
+            self.send_to_neighbors(self.encode_message({'type': 'update', 'lsas': pack_lsas(fresh)}))
+
+    def originate_lsa(self):
+        """
+        Starts a new LSA of this node's own links and installs it.
 
-        else:
-            # Otherwise source has never been seen, so it is the first time we have heard of it... New. 
-            # print("Entered the new portion")
-            self.seen[source] = seq
+        Parameters:
+        None
+
+        Returns:
+        lsa (tuple): (origin, seq, links), ready to be flooded
+
+        """
+        self.sequence_number += 1
+        lsa = (self.id, self.sequence_number, dict(self.link_costs))
+        self.install_lsa(*lsa)
+        return lsa
+
+    def install_lsa(self, origin, seq, links):
+        """
+        Stores an LSA if it is newer than the copy in the link state database
+        and applies the difference to world_representation.
 
-            # Update world representation
+        Parameters:
+        origin (int): router that originated the LSA
+        seq (int): originator's sequence number
+        links (dict): { neighbor: cost } for the originator's live links
+
+        Returns:
+        installed (bool): False if the LSA was old news
+
+        """
+        old_seq, old_links = self.lsdb.get(origin, (-1, {}))
+        if seq <= old_seq:
+            return False
+        self.lsdb[origin] = (seq, links)
+
+        for neighbor in old_links:
+            if neighbor not in links:
+                self.delete_link_cost(origin, neighbor)
+        for neighbor, cost in links.items():
+            self.set_link_cost(origin, neighbor, cost)
+        return True
+
+    def set_link_cost(self, source, destination, cost):
+        """
+        Records the cost of the link source -> destination in world_representation,
+        updating the forwarding table only if the stored cost actually changed.
+
+        Parameters:
+        source (int): id of the node at one end of the link
+        destination (int): id of the node at the other end of the link
+        cost (int): latency of the link
+
+        Returns:
+        None
+
+        """
+        if self.world_representation[source].get(destination) != cost:
             self.world_representation[source][destination] = cost
-            self.world_representation[destination][source] = cost
+            self.link_cost_changed(source, destination)
 
-            # If I am a brand new node, I might be missing information. Update that, too. 
-            self.update_global_info(neighbors_representation_of_the_world)
+    def delete_link_cost(self, source, destination):
+        """
+        Removes the link source -> destination from world_representation.
 
-            # Flooding to neighbors
-            self.send_to_neighbors(m)
+        Parameters:
+        source (int): id of the node at one end of the link
+        destination (int): id of the node at the other end of the link
 
+        Returns:
+        None
 
-    def update_global_info(self, neighbor_representation):
-        """Helper function that handles sharing information from a more knowledgeable node to a lesser one. 
-        
         """
-        for neighbor_source, neighbor_adj in neighbor_representation.items():
-            neighbor_source = int(neighbor_source)
+        del self.world_representation[source][destination]
+        self.link_cost_changed(source, destination)
+
+    def link_cost_changed(self, source, destination):
+        """
+        Repairs the shortest path tree for one changed link when running in
+        incremental mode, otherwise marks the forwarding table dirty.
+
+        Parameters:
+        source (int): id of the node at one end of the link
+        destination (int): id of the node at the other end of the link
+
+        Returns:
+        None
 
-            # If my neighbor has a source that I don't have. I should add that entire representation to my own
-            if neighbor_source not in self.world_representation:
-                self.world_representation[neighbor_source] = defaultdict(int)
+        """
+        if self.spt is None or self.forwarding_table_dirty:
+            self.forwarding_table_dirty = True
+            return
 
-            for dest, cost in neighbor_adj.items():
-                dest = int(dest)
-                if dest not in self.world_representation[neighbor_source]:
-                    self.world_representation[neighbor_source][dest] = cost
+        self.spt.update_edge(source, destination)
+        if self.verify_incremental_spf:
+            self.spt.check()
          
         
     def get_next_hop(self, destination):
@@ -176,30 +237,31 @@ class Link_State_Node(Node):
         hops (int): next Node to reach destination
 
         """
-        dist, prev = self.dijkstra(destination)
-        path = []
-        u = destination
-        source = self.id
+        if self.forwarding_table_dirty:
+            self.update_forwarding_table()
+        return self.forwarding_table.get(destination, -1)
 
-        while u is not None:
-            path.append(u)
-            u = prev[u]
+    def update_forwarding_table(self):
+        """
+        Rebuilds the forwarding table from a single run of Dijkstra over
+        world_representation, so lookups stay O(1) until the graph changes.
 
-        if path[-1] == source:
-            path.reverse()
-            return path[1]
-        else:
-            return -1
+        Parameters:
+        None
 
-        # https://en.wikipedia.org/wiki/Dijkstra%27s_algorithm
-        # 1  S ← empty sequence
-        # 2  u ← target
-        # 3  if prev[u] is defined or u = source:          // Proceed if the vertex is reachable
-        # 4      while u is defined:                       // Construct the shortest path with a stack S
-        # 5          insert u at the beginning of S        // Push the vertex onto the stack
-        # 6          u ← prev[u]                           // Traverse from target to source
+        Returns:
+        None
 
-    def dijkstra(self, destination):
+        """
+        if self.incremental_spf:
+            self.spt = Shortest_Path_Tree(self.world_representation, self.id, self.logging)
+            self.forwarding_table = self.spt.next_hop
+        else:
+            dist, prev = self.dijkstra()
+            self.forwarding_table = first_hops(prev, self.id)
+        self.forwarding_table_dirty = False
+
+    def dijkstra(self):
         '''
         Dijkstra's Shortest Path Algorithm
 
@@ -213,38 +275,254 @@ class Link_State_Node(Node):
 
         self.graph[source][dest] = latency
         '''
-        source = self.id
-        n_prime = set()
-        dist = {}
-        prev = {}
-        q = []
-
-        # Initialization:
-        for vertex in self.world_representation.keys():
-            if vertex == source:
-                dist[vertex] = 0
-            else:
-                dist[vertex] = float('inf')
-            prev[vertex] = None
-    
-            heapq.heappush(q, (dist[vertex], vertex))
-
-        # Loop - until N prime = N
-        while q:
-            _, w_vector = heapq.heappop(q)
-
-            if w_vector in n_prime:
+        return dijkstra(self.world_representation, self.id)
+
+
+def pack_lsas(lsas):
+    """
+    Flattens LSAs into one int list: origin, seq, link count, then neighbor, cost pairs.
+
+    Parameters:
+    lsas (list): [(origin, seq, {neighbor: cost}), ...]
+
+    Returns:
+    flat (list): ints, suitable for any message codec
+
+    """
+    flat = []
+    for origin, seq, links in lsas:
+        flat.extend((origin, seq, len(links)))
+        for neighbor, cost in links.items():
+            flat.extend((neighbor, cost))
+    return flat
+
+
+def unpack_lsas(flat):
+    """
+    Inverse of pack_lsas.
+    """
+    i = 0
+    while i < len(flat):
+        origin, seq, count = flat[i], flat[i + 1], flat[i + 2]
+        i += 3
+        yield origin, seq, {flat[i + 2 * j]: flat[i + 2 * j + 1] for j in range(count)}
+        i += 2 * count
+
+
+def dijkstra(graph, source):
+    """
+    Full Dijkstra over an adjacency map { id1: {id2: cost}, ... }.
+
+    Parameters:
+    graph (dict): adjacency map
+    source (int): root of the search
+
+    Returns:
+    dist (dict): { vertex: distance from source }
+    prev (dict): { vertex: previous vertex on the shortest path, None for source/unreachable }
+
+    """
+    n_prime = set()
+    dist = {}
+    prev = {}
+    q = []
+
+    # Initialization:
+    for vertex in graph.keys():
+        dist[vertex] = float('inf')
+        prev[vertex] = None
+    dist[source] = 0
+    prev[source] = None
+    heapq.heappush(q, (0, source))
+
+    # Loop - until N prime = N
+    while q:
+        _, w_vector = heapq.heappop(q)
+
+        if w_vector in n_prime:
+            continue
+        n_prime.add(w_vector)
+
+        for neighbor_v, weight in graph.get(w_vector, {}).items():
+            if neighbor_v in n_prime:
                 continue
-            n_prime.add(w_vector)
 
-            for neighbor_v, weight in self.world_representation[w_vector].items():
-                if neighbor_v in n_prime:
-                    continue
+            new_distance = dist[w_vector] + weight
+            if new_distance < dist.get(neighbor_v, float('inf')):
+                dist[neighbor_v] = new_distance
+                prev[neighbor_v] = w_vector
+                heapq.heappush(q, (new_distance, neighbor_v))
+
+    return dist, prev
+
+
+def first_hops(prev, source):
+    """
+    Turns a predecessor map into a forwarding table.
+
+    Parameters:
+    prev (dict): { vertex: previous vertex on the shortest path }
+    source (int): root of the shortest path tree
+
+    Returns:
+    table (dict): { destination: next_hop }, -1 if destination is unreachable
+
+    """
+    table = {}
+
+    # Walk each destination back towards the source, stopping early at any
+    # vertex whose first hop is already known (shared prefixes are walked once)
+    for destination in prev:
+        if destination == source or destination in table:
+            continue
+        hops = []
+        u = destination
+        while u is not None and u != source and u not in table:
+            hops.append(u)
+            u = prev[u]
+
+        if u is None:
+            next_hop = -1
+        elif u == source:
+            next_hop = hops[-1]
+        else:
+            next_hop = table[u]
+
+        for hop in hops:
+            table[hop] = next_hop
+
+    return table
+
+
+class Shortest_Path_Tree:
+    """
+    Shortest path tree rooted at one node that is repaired in place when a
+    single link cost rises, falls or disappears (dynamic SPF in the style of
+    Ramalingam-Reps), instead of rerunning Dijkstra over the whole graph.
+    Only the vertices whose distance actually changes are touched. All link
+    costs must be non-negative.
+    """
 
-                new_distance = dist[w_vector] + weight
-                if new_distance < dist[neighbor_v]:
-                    dist[neighbor_v] = new_distance
-                    prev[neighbor_v] = w_vector
-                    heapq.heappush(q, (new_distance, neighbor_v))
+    def __init__(self, graph, source, logger):
+        self.graph = graph # shared with the owning node, read only here
+        self.source = source
+        self.logging = logger
+        self.build()
 
-        return dist, prev
\ No newline at end of file
+    def build(self):
+        """
+        Full recompute, used once when the tree is created.
+        """
+        self.dist, self.prev = dijkstra(self.graph, self.source)
+        self.next_hop = first_hops(self.prev, self.source) # { destination: next_hop }
+        self.children = defaultdict(set) # { vertex: {vertices whose prev is vertex} }
+        self.reverse = defaultdict(set) # { vertex: {vertices with a live link into vertex} }
+
+        for v, u in self.prev.items():
+            if u is not None:
+                self.children[u].add(v)
+        for u, adj in self.graph.items():
+            for v in adj:
+                self.reverse[v].add(u)
+
+    def cost(self, u, v):
+        """
+        Returns the live cost of link u -> v, or None if it does not exist.
+        """
+        return self.graph.get(u, {}).get(v)
+
+    def update_edge(self, u, v):
+        """
+        Repairs the tree after the cost of link u -> v changed in the graph.
+
+        Parameters:
+        u (int): tail of the changed link
+        v (int): head of the changed link
+
+        Returns:
+        None
+
+        """
+        cost = self.cost(u, v)
+        if cost is None:
+            self.reverse[v].discard(u)
+        else:
+            self.reverse[v].add(u)
+
+        if v == self.source:
+            return
+
+        inf = float('inf')
+        old = self.dist.get(v, inf)
+        new = self.dist.get(u, inf) + cost if cost is not None else inf
+
+        if new < old:
+            # Link got cheaper (or appeared): push the improvement downstream from v
+            heap = []
+            self.relax(v, u, new, heap)
+            self.propagate(heap)
+        elif self.prev.get(v) == u and new > old:
+            # Tree link got dearer (or vanished): every vertex under v must re-attach
+            self.reattach_subtree(v)
+
+    def relax(self, v, parent, distance, heap):
+        if distance >= self.dist.get(v, float('inf')):
+            return
+        self.dist[v] = distance
+        self.set_prev(v, parent)
+        self.next_hop[v] = v if parent == self.source else self.next_hop[parent]
+        heapq.heappush(heap, (distance, v))
+
+    def propagate(self, heap):
+        while heap:
+            distance, u = heapq.heappop(heap)
+            if distance > self.dist[u]:
+                continue
+            for v, cost in self.graph.get(u, {}).items():
+                if v != self.source:
+                    self.relax(v, u, distance + cost, heap)
+
+    def set_prev(self, v, parent):
+        old = self.prev.get(v)
+        if old is not None:
+            self.children[old].discard(v)
+        self.prev[v] = parent
+        if parent is not None:
+            self.children[parent].add(v)
+
+    def reattach_subtree(self, root):
+        affected = set()
+        stack = [root]
+        while stack:
+            v = stack.pop()
+            affected.add(v)
+            stack.extend(self.children[v])
+
+        for v in affected:
+            self.dist[v] = float('inf')
+            self.set_prev(v, None)
+            self.next_hop[v] = -1
+
+        # Seed every affected vertex with its best link from the untouched part of the tree
+        heap = []
+        for v in affected:
+            for u in self.reverse[v]:
+                if u not in affected:
+                    self.relax(v, u, self.dist.get(u, float('inf')) + self.graph[u][v], heap)
+        self.propagate(heap)
+
+    def check(self):
+        """
+        Compares the incrementally maintained tree against a full recompute
+        and logs a warning for every vertex where they disagree.
+        """
+        inf = float('inf')
+        dist, prev = dijkstra(self.graph, self.source)
+        for v in set(dist) | set(self.dist):
+            if dist.get(v, inf) != self.dist.get(v, inf):
+                self.logging.warning("incremental SPF distance to %s is %s, full recompute says %s"
+                                     % (v, self.dist.get(v, inf), dist.get(v, inf)))
+            elif dist.get(v, inf) == inf and self.next_hop.get(v, -1) != -1:
+                self.logging.warning("incremental SPF routes to unreachable %s" % v)
+            elif v != self.source and dist.get(v, inf) != inf and self.dist[self.prev[v]] + self.graph[self.prev[v]][v] != self.dist[v]:
+                self.logging.warning("incremental SPF parent of %s is not on a shortest path" % v)
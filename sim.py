@@ -1,57 +1,150 @@
+import os
 import sys
 import logging
+import contextlib
 
 from simulator.config import *
-from simulator.topology import Topology, Get_Time
-from simulator.event_queue import Event_Queue
+from simulator.topology import Topology
+from simulator.event import Event_Handlers
+from simulator.profiler import Profiler
+from simulator.convergence import Convergence_Detector
+from simulator.correctness import Correctness_Monitor
 
 
 class Sim(Topology):
 
-    def __init__(self, algorithm, event_file, step='NORMAL'):
-        super().__init__(algorithm, step)
-        self.load_command_file(event_file)
+    def __init__(self, algorithm, event_file, step='NORMAL', scheduler='HEAP', batch=False, headless=False, results=None, stream=False,
+                 profile=None, converge=None, check=False):
+        super().__init__(algorithm, step, scheduler, headless, results)
+        if converge is not None:
+            self.convergence = Convergence_Detector(self, converge)
+        if check:
+            self.correctness = Correctness_Monitor(self)
+        self.batch = batch
+        self.event_count = 0
+        self.handlers = Event_Handlers(self)
+        self.profiler = None # with profile, a Profiler written to profile.json and profile.folded at the end
+        if profile is not None:
+            self.profiler = Profiler()
+            self.profiler.attach(self)
+        self.load_command_file(event_file, stream)
         self.dump_sim()
         self.dispatch_event(self.step)
+        self.logging.info("Total events dispatched: %d" % self.event_count)
         self.logging.info("Total messages sent: %d" % self.message_count)
+        self.logging.info("Total message bytes: %d" % self.message_bytes)
+        if self.convergence is not None:
+            self.logging.info("Convergence: " + self.convergence.summary())
+        if self.correctness is not None:
+            self.logging.info("Correctness: " + self.correctness.summary())
+        if self.profiler is not None:
+            self.profiler.write(profile)
+            self.logging.info("Profile written to %s.json and %s.folded" % (profile, profile))
 
     def __str__(self):
         ans = "==== Print Topology ====\n"
         ans += super().__str__()
         ans += "==== Print Event ====\n"
-        ans += Event_Queue.Str()
+        ans += str(self.event_queue)
         return ans
 
     def dump_sim(self):
-        self.logging.info("DUMP_SIM at Time %d\n" % Get_Time() + str(self))
+        self.logging.info("DUMP_SIM at Time %d\n" % self.get_time() + str(self))
 
     def dispatch_event(self, step='NORMAL'):
-        e = Event_Queue.Get_Earliest()
+        e = self.event_queue.get_earliest()
         while e:
-            e.dispatch()
+            self.event_count += 1
+            if self.batch and e.event_type == EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL:
+                self.dispatch_arrivals(e)
+            else:
+                e.dispatch()
             if step == 'SINGLE_STEP':
                 self.logging.info(str(e))
                 self.wait()
-            e = Event_Queue.Get_Earliest()
+            if (self.convergence is not None or self.correctness is not None) and self.event_queue.peek() is None:
+                if self.end_of_step():
+                    return
+            e = self.event_queue.get_earliest()
+
+    def end_of_step(self):
+        """
+        Runs the checks due once every event of the current second has been handled.
+        Returns True if the run should end here.
+        """
+        if self.correctness is not None:
+            self.correctness.check()
+        if self.convergence is not None and self.in_flight == 0:
+            self.convergence.quiescent()
+            if self.convergence.stopped:
+                self.logging.info("Routing converged at time %d, the rest of the event file is skipped" % self.get_time())
+                return True
+        return False
+
+    def dispatch_arrivals(self, e):
+        # Drain the run of routing messages due this second that starts with e, then hand
+        # each node all of its messages in one process_incoming_routing_messages call
+        batches = {}
+        while True:
+            node, m = e.args
+            batches.setdefault(node, []).append(m)
+            e = self.event_queue.peek()
+            if e is None or e.event_type != EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL:
+                break
+            self.event_queue.get_earliest()
+            self.event_count += 1
+
+        for node, messages in batches.items():
+            self.routing_messages_arrival(node, messages)
 
     def print_comment(self, comment):
-        self.logging.info('Time: %d, Comment: %s' % (Get_Time(), comment))
+        self.logging.info('Time: %d, Comment: %s' % (self.get_time(), comment))
 
 
 def main():
-    if len(sys.argv) < 3 or len(sys.argv) > 4 or sys.argv[1] not in ROUTE_ALGORITHM:
+    argv = [arg for arg in sys.argv if not arg.startswith('--')]
+    options = [arg for arg in sys.argv if arg.startswith('--')]
+    if len(argv) < 3 or len(argv) > 5 or argv[1] not in ROUTE_ALGORITHM or \
+            any(option not in SIM_OPTION for option in options):
         sys.stderr.write(USAGE_STR)
         sys.exit(-1)
 
     step = 'NO_STOP'
-    if len(sys.argv) == 4:
-        if sys.argv[3] not in STEP_COMMAND:
+    if len(argv) >= 4:
+        if argv[3] not in STEP_COMMAND:
             sys.stderr.write(USAGE_STR)
             sys.exit(-1)
         else:
-            step = sys.argv[3]
+            step = argv[3]
+
+    scheduler = 'HEAP'
+    if len(argv) == 5:
+        if argv[4] not in SCHEDULER:
+            sys.stderr.write(USAGE_STR)
+            sys.exit(-1)
+        else:
+            scheduler = argv[4]
+
+    converge = None
+    for option, mode in (('--converge', 'TRACK'), ('--skip-idle', 'SKIP'), ('--until-converged', 'STOP')):
+        if option in options:
+            converge = mode
+
+    profile = None
+    if '--profile' in options:
+        profile = OUTPUT_PATH + "%s_%s_profile" % (os.path.splitext(os.path.basename(argv[2]))[0], argv[1])
 
-    s = Sim(sys.argv[1], sys.argv[2], step)
+    if '--json' in options:
+        # stdout carries only the JSON results, anything else printed goes to stderr
+        results = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            s = Sim(argv[1], argv[2], step, scheduler, batch='--batch' in options, results=results,
+                    stream='--stream' in options, profile=profile, converge=converge,
+                    check='--check' in options)
+    else:
+        s = Sim(argv[1], argv[2], step, scheduler, batch='--batch' in options, headless='--headless' in options,
+                stream='--stream' in options, profile=profile, converge=converge,
+                check='--check' in options)
 
 
 if __name__ == '__main__':
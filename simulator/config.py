@@ -14,6 +14,30 @@ STEP_COMMAND = [
     "NO_STOP"
 ]
 
+SCHEDULER = [
+    "HEAP",
+    "CALENDAR",
+    "RADIX"
+]
+
+CONVERGE_MODE = [
+    "TRACK",
+    "STOP",
+    "SKIP"
+]
+
+SIM_OPTION = [
+    "--batch",
+    "--check",
+    "--converge",
+    "--headless",
+    "--json",
+    "--profile",
+    "--skip-idle",
+    "--stream",
+    "--until-converged"
+]
+
 ROUTE_ALGORITHM_NODE = {
     "GENERIC" : Generic_Node,
     "DISTANCE_VECTOR" : Distance_Vector_Node,
@@ -21,32 +45,65 @@ ROUTE_ALGORITHM_NODE = {
 }
 
 class EVENT_TYPE:
-    ADD_NODE = "ADD_NODE"
-    ADD_LINK = "ADD_LINK"
+    ADD_NODE = 0
+    ADD_LINK = 1
 
-    DELETE_NODE = "DELETE_NODE"
-    DELETE_LINK = "DELETE_LINK"
+    DELETE_NODE = 2
+    DELETE_LINK = 3
 
-    CHANGE_LINK = "CHANGE_LINK"
+    CHANGE_LINK = 4
 
-    PRINT = "PRINT"
-    DRAW_TOPOLOGY = "DRAW_TOPOLOGY"
-    DRAW_PATH = "DRAW_PATH"
-    DRAW_TREE = "DRAW_TREE"
-    DUMP_NODE = "DUMP_NODE"
-    DUMP_SIM = "DUMP_SIM"
+    PRINT = 5
+    DRAW_TOPOLOGY = 6
+    DRAW_PATH = 7
+    DRAW_TREE = 8
+    DUMP_NODE = 9
+    DUMP_SIM = 10
 
     # Not for user
-    ROUTING_MESSAGE_ARRIVAL = "ROUTING_MESSAGE_ARRIVAL"
-    SEND_LINK = "SEND_LINK"
+    ROUTING_MESSAGE_ARRIVAL = 11
+    SEND_LINK = 12
+    TIMER = 13
+
+
+# Command name of each EVENT_TYPE, indexed by its code
+EVENT_TYPE_NAME = [
+    "ADD_NODE",
+    "ADD_LINK",
+    "DELETE_NODE",
+    "DELETE_LINK",
+    "CHANGE_LINK",
+    "PRINT",
+    "DRAW_TOPOLOGY",
+    "DRAW_PATH",
+    "DRAW_TREE",
+    "DUMP_NODE",
+    "DUMP_SIM",
+    "ROUTING_MESSAGE_ARRIVAL",
+    "SEND_LINK",
+    "TIMER"
+]
+
+EVENT_TYPE_CODE = {name: code for code, name in enumerate(EVENT_TYPE_NAME)}
 
 
 OUTPUT_PATH = "output/"
 
-USAGE_STR = "usage: sim.py route_algorithm event [step=NORMAL]\n" \
+USAGE_STR = "usage: sim.py route_algorithm event [step=NORMAL] [scheduler=HEAP] [--batch] [--check] [--converge] [--headless] [--json]\n" \
+            "\t\t[--profile] [--skip-idle] [--stream] [--until-converged]\n" \
             "\troute_algorithm\t- {GENERIC DISTANCE_VECTOR LINK_STATE}\n" \
             "\tevent\t\t\t- a file\n" \
-            "\tstep\t\t\t- {NORMAL SINGLE_STEP NO_STOP}"
+            "\tstep\t\t\t- {NORMAL SINGLE_STEP NO_STOP}\n" \
+            "\tscheduler\t\t- {HEAP CALENDAR RADIX}\n" \
+            "\t--batch\t\t\t- deliver each node's routing messages of one second together\n" \
+            "\t--check\t\t\t- count the (source, destination) pairs routed correctly after every second\n" \
+            "\t--converge\t\t- log when routing converges after each topology change, with its time and messages\n" \
+            "\t--headless\t\t- check DRAW_* results without rendering (matplotlib is never loaded)\n" \
+            "\t--json\t\t\t- like --headless, and print each DRAW_* result as a JSON line\n" \
+            "\t--profile\t\t- time every event type, node callback and node, written to output/ as JSON and collapsed stacks\n" \
+            "\t--skip-idle\t\t- like --converge, and run the next event as soon as routing has converged\n" \
+            "\t--stream\t\t- read the event file lazily instead of posting every event up front\n" \
+            "\t--until-converged\t- like --converge, and end the run as soon as routing has converged"
 
 
 LOGGING_FORMAT = "[%(asctime)s][%(levelname)s] %(name)s: %(message)s"
@@ -0,0 +1,95 @@
+import math
+
+
+class Convergence_Detector:
+    """
+    Splits a simulation into epochs and times how long routing takes to converge in each.
+
+    An epoch opens with the first topology change after the network was quiescent and
+    collects every change made before it is quiescent again. The network is quiescent
+    when no routing message, link update or node timer is in flight (Topology.in_flight)
+    and no other event is due at the current time. It has converged when, on top of that,
+    every node's next hops lead to every destination along a correct shortest path.
+    The time from the epoch's first change to its quiescence is its convergence time.
+
+    mode is one of CONVERGE_MODE:
+        TRACK - only record the epochs
+        STOP  - end the run at the first convergence
+        SKIP  - cut the idle time out of the clock whenever the network is quiescent, after
+                each convergence and between a DRAW_* and the next topology change alike, so
+                the next scripted event happens as soon as nothing is left to do
+    """
+
+    check_forwarding = True # walk every pair at quiescence to tell convergence from mere quiescence, O(n^2) per
+                            # epoch; off, epochs are only timed and converged is None, as large benchmarks do
+
+    def __init__(self, topology, mode='TRACK'):
+        self.topology = topology
+        self.mode = mode
+        self.epoch = None # the open epoch, None while the network is quiescent
+        self.epochs = [] # closed epochs, see close
+        self.stopped = False # set in STOP mode once the network has converged
+
+    def change(self):
+        """Called on every change to the topology."""
+        if self.epoch is None:
+            self.epoch = {"start": self.topology.get_time(), "changes": 0, "messages": self.topology.message_count}
+        self.epoch["changes"] += 1
+
+    def quiescent(self):
+        """Called whenever the network is quiescent; closes the open epoch, if any."""
+        if self.epoch is not None:
+            converged = self.forwarding_agrees() if self.check_forwarding else None
+            self.close(converged)
+            if converged and self.mode == 'STOP':
+                self.stopped = True
+                return
+        if self.mode == 'SKIP':
+            self.topology.event_queue.skip_idle()
+
+    def close(self, converged):
+        topology = self.topology
+        epoch = self.epoch
+        self.epoch = None
+        epoch["epoch"] = len(self.epochs)
+        epoch["converged"] = converged
+        epoch["end"] = topology.get_time()
+        epoch["convergence_time"] = epoch["end"] - epoch["start"] if converged is not False else None
+        epoch["messages"] = topology.message_count - epoch["messages"]
+        self.epochs.append(epoch)
+
+        if converged:
+            topology.logging.info("Epoch %d: %d changes at time %d converged at time %d after %d messages" % (
+                epoch["epoch"], epoch["changes"], epoch["start"], epoch["end"], epoch["messages"]))
+        elif converged is None:
+            topology.logging.info("Epoch %d: %d changes at time %d, quiescent at time %d after %d messages" % (
+                epoch["epoch"], epoch["changes"], epoch["start"], epoch["end"], epoch["messages"]))
+        else:
+            topology.logging.warning("Epoch %d: %d changes at time %d, quiescent at time %d after %d messages "
+                                     "but some forwarding tables are wrong" % (
+                epoch["epoch"], epoch["changes"], epoch["start"], epoch["end"], epoch["messages"]))
+        if topology.results is not None:
+            topology.report({"event": "CONVERGENCE", **epoch})
+
+    def forwarding_agrees(self):
+        """
+        Returns True if every node's next hops give a shortest path to every destination.
+        One pass over all pairs, sharing the next hops and resolved paths across sources.
+        """
+        topology = self.topology
+        hops, memo = {}, {}
+        for source in topology.adj:
+            dist, _ = topology.oracle.tree(source)
+            for destination in topology.adj:
+                if destination == source:
+                    continue
+                _, length = topology.get_user_path(source, destination, hops, memo, quiet=True)
+                if length != dist.get(destination, math.inf):
+                    return False
+        return True
+
+    def summary(self):
+        times = [epoch["convergence_time"] for epoch in self.epochs if epoch["convergence_time"] is not None]
+        return "%d epochs, %d converged, convergence time mean %s max %s, %d messages" % (
+            len(self.epochs), sum(epoch["converged"] is True for epoch in self.epochs), "%.1f" % (sum(times) / len(times)) if times else "-",
+            max(times, default="-"), sum(epoch["messages"] for epoch in self.epochs))
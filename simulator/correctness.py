@@ -0,0 +1,296 @@
+import heapq
+import math
+
+from simulator.oracle import dijkstra
+
+
+# Past this many link changes in one time step the correct paths are recomputed from scratch
+INCREMENTAL_MAX_CHANGES = 64
+
+
+class Correctness_Monitor:
+    """
+    Checks every (source, destination) pair after each time step, for a curve of
+    how many of them the nodes route correctly over the whole run.
+
+    Both sides are kept up to date incrementally. The correct distances from every
+    source are repaired after each link change, touching only the destinations
+    whose distance changes. The user's side is a cache of every node's next hops
+    with, per destination, the length of the path they lead along. Only nodes that
+    received a routing message or link update are asked again, and only the paths
+    running through a changed next hop or link are walked again, so a time step
+    costs in proportion to what changed rather than a DRAW_TREE from every node.
+    """
+
+    verify = False # compare against a full recompute after every check (slow)
+
+    def __init__(self, topology):
+        self.topology = topology
+        self.adj = {} # { node: {neighbor: latency} }, the topology as of the last check
+        self.dist = {} # { source: { destination: correct length } }, reachable destinations only
+        self.prev = {} # { source: { destination: predecessor } }, a correct shortest path tree
+        self.hop = {} # { node: { destination: next hop the node answered } }
+        self.length = {} # { destination: { node: length of the path the next hops lead along } }
+        self.upstream = {} # { destination: { next hop: nodes that answered it } }
+        self.wrong = set() # (source, destination) pairs whose path length is not the correct one
+        self.changes = [] # changes to the topology since the last check, as given to Topology.mutate
+        self.touched = set() # nodes that got a routing message or link update since the last check
+        self.new = set() # nodes added since the last check
+        self.curve = [] # (time, correct pairs, pairs) for every time step checked
+
+    def change(self, *change):
+        self.changes.append(change)
+
+    def touch(self, node):
+        self.touched.add(node)
+
+    def check(self):
+        """Called at the end of a time step; brings both sides up to date and records a point of the curve."""
+        if not self.changes and not self.touched:
+            return
+        dirty = {} # { destination: nodes whose path length may have changed }
+        truth = self.apply_changes(dirty)
+        self.ask(dirty)
+
+        for d, nodes in dirty.items():
+            if d in self.adj:
+                self.walk(d, nodes)
+        for s, d in self.all_pairs() if truth is None else truth:
+            if s in self.adj and d in self.adj:
+                self.compare(s, d)
+
+        n = len(self.adj)
+        self.curve.append((self.topology.get_time(), n * (n - 1) - len(self.wrong), n * (n - 1)))
+        if self.topology.results is not None:
+            self.topology.report({"event": "CORRECTNESS", "correct_pairs": self.curve[-1][1], "pairs": self.curve[-1][2]})
+        if self.verify:
+            self.audit()
+
+    def apply_changes(self, dirty):
+        """
+        Replays the changes on self.adj and repairs the correct distances. Returns the
+        (source, destination) pairs whose correct length changed, or None for all of them.
+        """
+        changes, self.changes = self.changes, []
+        full = sum(change[0] in ('add_link', 'delete_link') for change in changes) > INCREMENTAL_MAX_CHANGES
+        truth = set()
+
+        for change in changes:
+            if change[0] == 'add_node':
+                self.add_node(change[1])
+            elif change[0] == 'delete_node':
+                self.delete_node(change[1], dirty)
+            else:
+                a, b = change[1], change[2]
+                old = self.adj[a].get(b)
+                new = change[3] if change[0] == 'add_link' else None
+                if new is None:
+                    del self.adj[a][b], self.adj[b][a]
+                else:
+                    self.adj[a][b] = self.adj[b][a] = new
+                self.link_changed(a, b, dirty)
+                if not full:
+                    self.repair(a, b, old, new, truth)
+
+        if full:
+            for s in self.adj:
+                self.dist[s], self.prev[s] = dijkstra(self.adj, s)
+            return None
+        return truth
+
+    def add_node(self, x):
+        self.adj[x] = {}
+        self.dist[x], self.prev[x] = {x: 0}, {x: None}
+        self.hop[x] = {}
+        self.length[x] = {x: 0}
+        self.upstream[x] = {}
+        self.new.add(x)
+
+    def delete_node(self, x, dirty):
+        # Its links are already gone, see Topology.delete_node
+        del self.adj[x], self.dist[x], self.prev[x], self.length[x], self.upstream[x]
+        for d, h in self.hop.pop(x).items():
+            self.upstream[d][h].discard(x)
+        for hops in self.hop.values():
+            hops.pop(x, None)
+        for d, upstream in self.upstream.items():
+            dirty.setdefault(d, set()).update(upstream.get(x, ()))
+        dirty.pop(x, None)
+        self.touched.discard(x)
+        self.new.discard(x)
+        self.wrong = {(s, d) for s, d in self.wrong if s != x and d != x}
+
+    def link_changed(self, a, b, dirty):
+        # Paths that go over the link change length or break
+        for d, upstream in self.upstream.items():
+            if a in upstream.get(b, ()):
+                dirty.setdefault(d, set()).add(a)
+            if b in upstream.get(a, ()):
+                dirty.setdefault(d, set()).add(b)
+
+    def repair(self, a, b, old, new, truth):
+        """Repairs the correct distances from every source after the a-b link went from old to new."""
+        if new == old:
+            return
+        for s in self.dist:
+            if new is not None and (old is None or new < old):
+                self.improve(s, a, b, truth)
+                self.improve(s, b, a, truth)
+            elif self.prev[s].get(b) == a:
+                self.reattach(s, b, truth)
+            elif self.prev[s].get(a) == b:
+                self.reattach(s, a, truth)
+
+    def improve(self, s, u, v, truth):
+        dist = self.dist[s]
+        if u not in dist or dist[u] + self.adj[u][v] >= dist.get(v, math.inf):
+            return
+        dist[v] = dist[u] + self.adj[u][v]
+        self.prev[s][v] = u
+        truth.add((s, v))
+        self.propagate(s, [(dist[v], v)], truth)
+
+    def reattach(self, s, root, truth):
+        """
+        The link above root in the tree of s got longer or went away: drops the subtree
+        under root and joins each of its vertices back through its best neighbor outside.
+        """
+        dist, prev = self.dist[s], self.prev[s]
+        subtree = [root]
+        inside = {root}
+        for y in subtree:
+            for z in self.adj[y]:
+                if z not in inside and prev.get(z) == y:
+                    inside.add(z)
+                    subtree.append(z)
+
+        old = {y: dist.pop(y) for y in subtree}
+        for y in subtree:
+            del prev[y]
+        heap = []
+        for y in subtree:
+            for z, latency in self.adj[y].items():
+                if z not in inside and z in dist and dist[z] + latency < dist.get(y, math.inf):
+                    dist[y] = dist[z] + latency
+                    prev[y] = z
+            if y in dist:
+                heap.append((dist[y], y))
+        heapq.heapify(heap)
+        self.propagate(s, heap, truth)
+        truth.update((s, y) for y in subtree if dist.get(y) != old[y])
+
+    def propagate(self, s, heap, truth):
+        dist, prev = self.dist[s], self.prev[s]
+        while heap:
+            d, x = heapq.heappop(heap)
+            if d > dist[x]:
+                continue
+            for y, latency in self.adj[x].items():
+                if d + latency < dist.get(y, math.inf):
+                    dist[y] = d + latency
+                    prev[y] = x
+                    truth.add((s, y))
+                    heapq.heappush(heap, (dist[y], y))
+
+    def ask(self, dirty):
+        """Asks the touched and new nodes for every destination, and everyone else for the new ones."""
+        touched = self.touched | self.new
+        for x in touched:
+            get_next_hop, hops = self.topology.nodes[x].get_next_hop, self.hop[x]
+            for d in self.adj:
+                if d != x:
+                    h = get_next_hop(d)
+                    if d not in hops or hops[d] != h:
+                        self.set_hop(x, d, h, dirty)
+        for d in self.new:
+            for x in self.adj:
+                if x != d and x not in touched:
+                    self.set_hop(x, d, self.topology.nodes[x].get_next_hop(d), dirty)
+        self.touched = set()
+        self.new = set()
+
+    def set_hop(self, x, d, h, dirty):
+        hops = self.hop[x]
+        if d in hops:
+            if hops[d] == h:
+                return
+            self.upstream[d][hops[d]].discard(x)
+        hops[d] = h
+        self.upstream[d].setdefault(h, set()).add(x)
+        dirty.setdefault(d, set()).add(x)
+
+    def walk(self, d, nodes):
+        """
+        Recomputes the path lengths towards d of nodes and of everything whose next
+        hops lead through them, then compares each with the correct length.
+        """
+        upstream = self.upstream[d]
+        affected = [x for x in nodes if x in self.adj]
+        seen = set(affected)
+        for y in affected:
+            for z in upstream.get(y, ()):
+                if z not in seen:
+                    seen.add(z)
+                    affected.append(z)
+
+        length = self.length[d]
+        for x in affected:
+            length.pop(x, None)
+        for x in affected:
+            if x in length:
+                continue
+            # Follow next hops until a node whose length is known, as Topology.get_user_path does
+            path, on_path = [], set()
+            y = x
+            while y not in length:
+                path.append(y)
+                on_path.add(y)
+                h = self.hop[y].get(d)
+                if h not in self.adj[y] or h in on_path:
+                    total = math.inf
+                    break
+                y = h
+            else:
+                total = length[y]
+            for y in reversed(path):
+                if total != math.inf:
+                    total += self.adj[y][self.hop[y][d]]
+                length[y] = total
+        for x in affected:
+            self.compare(x, d)
+
+    def compare(self, s, d):
+        if self.length[d][s] == self.dist[s].get(d, math.inf):
+            self.wrong.discard((s, d))
+        else:
+            self.wrong.add((s, d))
+
+    def all_pairs(self):
+        return ((s, d) for s in self.adj for d in self.adj if s != d)
+
+    def audit(self):
+        """Logs a warning for every pair where a full recompute disagrees with the incremental state."""
+        topology = self.topology
+        hops, memo = {}, {}
+        for s in topology.adj:
+            dist, _ = dijkstra(topology.adj, s)
+            for d in topology.adj:
+                if d == s:
+                    continue
+                if self.dist[s].get(d, math.inf) != dist.get(d, math.inf):
+                    topology.logging.warning("correct length %s -> %s is %s, full recompute says %s" % (
+                        s, d, self.dist[s].get(d, math.inf), dist.get(d, math.inf)))
+                _, length = topology.get_user_path(s, d, hops, memo, quiet=True)
+                if length != self.length[d][s]:
+                    topology.logging.warning("user length %s -> %s is %s, walking the next hops says %s" % (
+                        s, d, self.length[d][s], length))
+                if ((s, d) in self.wrong) != (length != dist.get(d, math.inf)):
+                    topology.logging.warning("pair %s -> %s is wrongly counted as %s" % (
+                        s, d, "wrong" if (s, d) in self.wrong else "correct"))
+
+    def summary(self):
+        if not self.curve:
+            return "no time step checked"
+        time, correct, pairs = min(self.curve, key=lambda point: point[1] / point[2] if point[2] else 1)
+        return "%d time steps checked, %d of %d pairs correct at the end, lowest %d of %d at time %d" % (
+            len(self.curve), self.curve[-1][1], self.curve[-1][2], correct, pairs, time)
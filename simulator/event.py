@@ -1,64 +1,46 @@
-import sys
-
 from simulator.config import *
 
 
+# Sim method that handles each EVENT_TYPE and how many arguments it takes, indexed by code
+EVENT_HANDLER = [
+    ("add_node", 1),
+    ("add_link", 3),
+    ("delete_node", 1),
+    ("delete_link", 2),
+    ("change_link", 3),
+    ("print_comment", 1),
+    ("draw_topology", 0),
+    ("draw_path", 2),
+    ("draw_tree", 1),
+    ("dump_node", 1),
+    ("dump_sim", 0),
+    ("routing_message_arrival", 2),
+    ("send_link", 3),
+    ("timer", 3)
+]
+
+
+def Event_Handlers(sim):
+    """Dispatch table of sim's bound handlers, indexed by EVENT_TYPE code, each called as h(*event.args)."""
+    return [getattr(sim, name) for name, num_args in EVENT_HANDLER]
+
+
 class Event:
+    __slots__ = ('time_stamp', 'event_type', 'sim', 'args')
 
-    def __init__(self, time_stamp, event_type, sim, arg1 = -1, arg2 = -1, arg3 = -1):
+    def __init__(self, time_stamp, event_type, sim, *args):
         self.time_stamp = time_stamp
         self.event_type = event_type
         self.sim = sim
 
-        self.arg1 = arg1
-        self.arg2 = arg2
-        self.arg3 = arg3
-
-    def __lt__(self, other):
-        if self.time_stamp == other.time_stamp:
-            if self.event_type != EVENT_TYPE.SEND_LINK and other.event_type == EVENT_TYPE.SEND_LINK:
-                return True
-        return self.time_stamp < other.time_stamp
+        self.args = args # exactly the arguments of the event type's handler, see EVENT_HANDLER
 
     def __str__(self):
         args = ""
-        if self.arg1 != -1:
-            args += " " + str(self.arg1)
-        if self.arg2 != -1:
-            args += " " + str(self.arg2)
-        if self.arg3 != -1:
-            args += " " + str(self.arg3)
+        for arg in self.args:
+            args += " " + str(arg)
 
-        return "Time_Stamp: " + str(self.time_stamp) + " Event_Type: " + self.event_type + args
+        return "Time_Stamp: " + str(self.time_stamp) + " Event_Type: " + EVENT_TYPE_NAME[self.event_type] + args
 
     def dispatch(self):
-        if self.event_type == EVENT_TYPE.ADD_NODE:
-            self.sim.add_node(self.arg1)
-        elif self.event_type == EVENT_TYPE.ADD_LINK:
-            self.sim.add_link(self.arg1, self.arg2, self.arg3)
-        elif self.event_type == EVENT_TYPE.CHANGE_LINK:
-            self.sim.change_link(self.arg1, self.arg2, self. arg3)
-        elif self.event_type == EVENT_TYPE.DELETE_LINK:
-            self.sim.delete_link(self.arg1, self.arg2)
-        elif self.event_type == EVENT_TYPE.DELETE_NODE:
-            self.sim.delete_node(self.arg1)
-        elif self.event_type == EVENT_TYPE.PRINT:
-            self.sim.print_comment(self.arg1)
-        elif self.event_type == EVENT_TYPE.DUMP_NODE:
-            self.sim.dump_node(self.arg1)
-        elif self.event_type == EVENT_TYPE.DRAW_TOPOLOGY:
-            self.sim.draw_topology()
-        elif self.event_type == EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL:
-            self.sim.routing_message_arrival(self.arg1, self.arg2)
-        elif self.event_type == EVENT_TYPE.DUMP_SIM:
-            self.sim.dump_sim()
-        elif self.event_type == EVENT_TYPE.DRAW_PATH:
-            self.sim.draw_path(self.arg1, self.arg2)
-        elif self.event_type == EVENT_TYPE.DRAW_TREE:
-            self.sim.draw_tree(self.arg1)
-        elif self.event_type == EVENT_TYPE.SEND_LINK:
-            self.sim.send_link(self.arg1, self.arg2, self.arg3)
-        else:
-            pass
-            # sys.stderr.write("Unknown event type %s" % self.event_type)
-            # sys.exit(-1)
+        self.sim.handlers[self.event_type](*self.args)
@@ -0,0 +1,232 @@
+import argparse
+import heapq
+import itertools
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from simulator.config import *
+from simulator.event import EVENT_HANDLER
+
+
+# Commands sorted in memory at a time when an event file has to be sorted externally
+SORT_CHUNK_COMMANDS = 100000
+
+# Binary event trace: header, one fixed-width record per command, then the PRINT string table.
+# Header: magic, number of records, offset of the string table.
+# Record: time, event type code, number of args, arg1..arg3 (unused ones are -1);
+#         the single arg of PRINT is an index into the string table.
+# String table: number of strings, then each as its length and UTF-8 bytes.
+TRACE_MAGIC = b'RSTRACE1'
+TRACE_HEADER = struct.Struct('<8sqq')
+TRACE_RECORD = struct.Struct('<qHHiii')
+TRACE_LENGTH = struct.Struct('<I')
+
+
+def parse_command(line, quiet=False):
+    """
+    Parses one line of an event file.
+
+    Parameters:
+        line - the line as read from the file
+        quiet - skip unknown commands without logging a warning
+    Returns:
+        (time_stamp, event_type, args), or None for blank lines, comments and unknown commands
+    """
+    line = line.strip()
+    if line == "" or line[0] == '#':
+        return None
+
+    items = line.split(' ')
+    time_stamp = int(items[0])
+    if items[1] not in EVENT_TYPE_CODE:
+        if not quiet:
+            logging.getLogger('Sim').warning("unknown event type %s" % items[1])
+        return None
+    event_type = EVENT_TYPE_CODE[items[1]]
+
+    num_args = len(items) - 2
+    if event_type == EVENT_TYPE.PRINT:
+        return time_stamp, event_type, ("".join(items[2:]),)
+    elif num_args < 0 or num_args > 3:
+        sys.stderr.write(line)
+        raise BufferError
+    # Handlers are called with exactly their own arguments: missing ones are -1, extra ones dropped
+    args = tuple(int(item) for item in items[2:])
+    num_args = EVENT_HANDLER[event_type][1]
+    return time_stamp, event_type, args[:num_args] + (-1,) * (num_args - len(args))
+
+
+def format_command(command):
+    time_stamp, event_type, args = command
+    return " ".join([str(time_stamp), EVENT_TYPE_NAME[event_type]] + [str(arg) for arg in args]) + "\n"
+
+
+def command_order(command):
+    # The order Event_Queue pops events posted at once: by time, SEND_LINK last, then as posted
+    return command[0], command[1] == EVENT_TYPE.SEND_LINK
+
+
+def read_commands(file, quiet=False):
+    """Yields the commands of file in file order, one line at a time, or one record at a time from a trace."""
+    if is_trace(file):
+        yield from read_trace(file)
+        return
+    with open(file) as f:
+        for line in f:
+            command = parse_command(line, quiet)
+            if command is not None:
+                yield command
+
+
+def is_trace(file):
+    with open(file, 'rb') as f:
+        return f.read(len(TRACE_MAGIC)) == TRACE_MAGIC
+
+
+def read_trace(file):
+    """Yields the commands of a binary trace in file order, reading the records through mmap."""
+    with open(file, 'rb') as f:
+        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, count, strings_offset = TRACE_HEADER.unpack_from(m, 0)
+
+    strings = []
+    offset = strings_offset + TRACE_LENGTH.size
+    for _ in range(TRACE_LENGTH.unpack_from(m, strings_offset)[0]):
+        length = TRACE_LENGTH.unpack_from(m, offset)[0]
+        offset += TRACE_LENGTH.size
+        strings.append(m[offset:offset + length].decode())
+        offset += length
+
+    start = TRACE_HEADER.size
+    records = memoryview(m)[start:start + count * TRACE_RECORD.size]
+    for time_stamp, event_type, num_args, arg1, arg2, arg3 in TRACE_RECORD.iter_unpack(records):
+        if event_type == EVENT_TYPE.PRINT:
+            yield time_stamp, event_type, (strings[arg1],)
+        else:
+            yield time_stamp, event_type, (arg1, arg2, arg3)[:num_args]
+
+
+class Text_Writer:
+    """Writes commands as the lines of a .event file."""
+
+    def __init__(self, file):
+        self.f = open(file, 'w')
+        self.count = 0
+
+    def command(self, time_stamp, event_type, *args):
+        self.f.write(format_command((time_stamp, event_type, args)))
+        self.count += 1
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Trace_Writer:
+    """
+    Writes commands as a binary trace, see TRACE_RECORD. Records are streamed to the
+    file; only the PRINT strings are kept until close writes the table and header.
+    """
+
+    def __init__(self, file):
+        self.f = open(file, 'wb')
+        self.f.write(TRACE_HEADER.pack(TRACE_MAGIC, 0, 0))
+        self.count = 0
+        self.strings = {} # { string: index in the table }
+
+    def command(self, time_stamp, event_type, *args):
+        if event_type == EVENT_TYPE.PRINT:
+            args = (self.strings.setdefault(args[0], len(self.strings)),)
+        self.f.write(TRACE_RECORD.pack(time_stamp, event_type, len(args), *(args + (-1,) * (3 - len(args)))))
+        self.count += 1
+
+    def close(self):
+        strings_offset = self.f.tell()
+        self.f.write(TRACE_LENGTH.pack(len(self.strings)))
+        for string in self.strings:
+            data = string.encode()
+            self.f.write(TRACE_LENGTH.pack(len(data)))
+            self.f.write(data)
+        self.f.seek(0)
+        self.f.write(TRACE_HEADER.pack(TRACE_MAGIC, self.count, strings_offset))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_writer(file, trace=False):
+    return Trace_Writer(file) if trace else Text_Writer(file)
+
+
+def is_time_ordered(file):
+    """
+    Parses all of file, so format errors surface before the simulation starts.
+    Returns True if its commands already come in the order Event_Queue would pop them.
+    """
+    ordered = True
+    last = None
+    for command in read_commands(file):
+        key = command_order(command)
+        if last is not None and key < last:
+            ordered = False
+        last = key
+    return ordered
+
+
+def sorted_commands(file):
+    """
+    Yields the commands of file in the order Event_Queue would pop them, keeping
+    commands of equal order in file order. Files that are already ordered are
+    streamed as they are; others are sorted in chunks of SORT_CHUNK_COMMANDS
+    that spill to temporary files and are merged back lazily.
+    """
+    if is_time_ordered(file):
+        yield from read_commands(file, quiet=True)
+        return
+
+    commands = read_commands(file, quiet=True)
+    chunk = sorted(itertools.islice(commands, SORT_CHUNK_COMMANDS), key=command_order)
+    if len(chunk) < SORT_CHUNK_COMMANDS:
+        yield from chunk
+        return
+
+    with tempfile.TemporaryDirectory(prefix='events_') as tmp:
+        runs = []
+        while chunk:
+            path = os.path.join(tmp, 'run_%d' % len(runs))
+            with open(path, 'w') as f:
+                f.writelines(format_command(command) for command in chunk)
+            runs.append(path)
+            chunk = sorted(itertools.islice(commands, SORT_CHUNK_COMMANDS), key=command_order)
+
+        # heapq.merge keeps equal keys in the order of the runs, i.e. in file order
+        yield from heapq.merge(*[read_commands(path, quiet=True) for path in runs], key=command_order)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert between .event files and binary event traces.')
+    parser.add_argument('source', help='.event file or trace to read')
+    parser.add_argument('destination', help='file to write')
+    parser.add_argument('--to', choices=['trace', 'event'], default='trace', help='format to write')
+    args = parser.parse_args()
+
+    with open_writer(args.destination, trace=args.to == 'trace') as writer:
+        for time_stamp, event_type, command_args in read_commands(args.source):
+            writer.command(time_stamp, event_type, *command_args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,287 @@
 import heapq
+import itertools
+import math
+from collections import deque
+
+from simulator.config import *
 
 
 class Event_Queue:
-    q = []
-    Current_Time = 0
+    """
+    Pending events of one simulation. The ordering itself is delegated to one
+    of the SCHEDULER_QUEUE backends; all of them pop events by time stamp, with
+    SEND_LINK events running after every other event of the same second.
+    """
 
-    @staticmethod
-    def Post(e):
-        heapq.heappush(Event_Queue.q, e)
+    def __init__(self, scheduler='HEAP'):
+        self.scheduler = SCHEDULER_QUEUE[scheduler]()
+        self.current_time = 0
+        self.stream = None # ordered iterator of events not yet handed to the scheduler, see attach
+        self.stream_head = None # next event of stream
+        self.horizon = math.inf # every stream event up to this time is in the scheduler
+        self.skipped = 0 # idle time cut out of the clock, see skip_idle
+        self.idle_since = None
 
-    @staticmethod
-    def Get_Earliest():
-        if Event_Queue.q == []:
-            return None
-        e = heapq.heappop(Event_Queue.q)
-        Event_Queue.Current_Time = e.time_stamp
+    def attach(self, events):
+        """
+        Merges events, an iterator ordered the way this queue pops, reading it only
+        as far as the latest time posted so far. Each of its events reaches the
+        scheduler before any other event with the same time stamp is posted, so the
+        run is the same as if all of them had been posted up front.
+        """
+        self.stream = iter(events)
+        self.stream_head = next(self.stream, None)
+        self.horizon = -1 if self.stream_head is not None else math.inf
+
+    def pull(self, time_stamp):
+        while self.stream_head is not None and self.stream_head.time_stamp <= time_stamp:
+            self.scheduler.push(self.stream_head)
+            self.stream_head = next(self.stream, None)
+        self.horizon = time_stamp if self.stream_head is not None else math.inf
+
+    def post(self, e):
+        if e.time_stamp > self.horizon:
+            self.pull(e.time_stamp)
+        self.scheduler.push(e)
+
+    def skip_idle(self):
+        """
+        Cuts the time until the next event out of the clock, as if that event had
+        been posted for now. Events keep their time stamps, get_current_time moves.
+        """
+        self.idle_since = self.current_time
+
+    def get_earliest(self):
+        e = self.scheduler.pop()
+        if e is None and self.stream_head is not None:
+            self.pull(self.stream_head.time_stamp)
+            e = self.scheduler.pop()
+        if e is not None:
+            if self.idle_since is not None:
+                self.skipped += e.time_stamp - self.idle_since
+                self.idle_since = None
+            self.current_time = e.time_stamp
         return e
 
-    @staticmethod
-    def Str():
+    def peek(self):
+        # Next event if it is due at the current time, otherwise None
+        return self.scheduler.peek(self.current_time)
+
+    def get_current_time(self):
+        # current_time orders events, this is the clock the simulation reports
+        return self.current_time - self.skipped
+
+    def __len__(self):
+        # Events of an attached stream count once they have been read
+        return len(self.scheduler)
+
+    def __str__(self):
         ans = ""
-        for i in Event_Queue.q:
+        for i in sorted(self.scheduler.events(), key=lambda e: e.time_stamp):
             ans += str(i)
             ans += "\n"
+        if self.stream_head is not None:
+            ans += "... events from time %d on are still in the event file\n" % self.stream_head.time_stamp
         return ans
 
-    @staticmethod
-    def Get_Current_Time():
-        return Event_Queue.Current_Time
+
+class Heap_Scheduler:
+    """
+    Binary heap of (time, is_send_link, seq, event) entries. Comparisons stay
+    on the leading ints, never reaching the event, and seq makes events of the
+    same second and class come out in the order they were posted.
+    """
+
+    def __init__(self):
+        self.q = []
+        self.seq = itertools.count()
+
+    def push(self, e):
+        heapq.heappush(self.q, (e.time_stamp, e.event_type == EVENT_TYPE.SEND_LINK, next(self.seq), e))
+
+    def pop(self):
+        if self.q == []:
+            return None
+        return heapq.heappop(self.q)[3]
+
+    def peek(self, time_stamp):
+        if self.q == [] or self.q[0][0] != time_stamp:
+            return None
+        return self.q[0][3]
+
+    def events(self):
+        return (entry[3] for entry in self.q)
+
+    def __len__(self):
+        return len(self.q)
+
+
+class Bucket:
+    """FIFO of the events sharing one time stamp, SEND_LINK events kept apart so they run last."""
+
+    __slots__ = ('first', 'last')
+
+    def __init__(self):
+        self.first = deque()
+        self.last = deque()
+
+    def add(self, e):
+        if e.event_type == EVENT_TYPE.SEND_LINK:
+            self.last.append(e)
+        else:
+            self.first.append(e)
+
+    def pop(self):
+        if self.first:
+            return self.first.popleft()
+        return self.last.popleft()
+
+    def peek(self):
+        if self.first:
+            return self.first[0]
+        return self.last[0]
+
+    def __iter__(self):
+        yield from self.first
+        yield from self.last
+
+    def __len__(self):
+        return len(self.first) + len(self.last)
+
+
+class Calendar_Scheduler:
+    """
+    Calendar queue for integer time stamps. A ring of width one-tick buckets
+    covers [now, now + width); anything further out waits in an overflow map
+    keyed by time and moves into the ring as the window slides. Routing
+    messages land at most a few latencies ahead, so push and pop are O(1).
+    """
+
+    def __init__(self, width=1024):
+        self.width = width
+        self.ring = [None] * width
+        self.ring_size = 0
+        self.now = 0
+        self.far = {} # { time: Bucket } for times >= now + width
+        self.far_times = [] # heap of the keys of far
+        self.size = 0
+
+    def push(self, e):
+        t = e.time_stamp
+        if t < self.now:
+            raise ValueError("event at time %d posted after time %d" % (t, self.now))
+        if t < self.now + self.width:
+            slot = t % self.width
+            if self.ring[slot] is None:
+                self.ring[slot] = Bucket()
+            self.ring[slot].add(e)
+            self.ring_size += 1
+        else:
+            if t not in self.far:
+                self.far[t] = Bucket()
+                heapq.heappush(self.far_times, t)
+            self.far[t].add(e)
+        self.size += 1
+
+    def pop(self):
+        if self.size == 0:
+            return None
+        while True:
+            if self.ring_size == 0:
+                # Nothing in the window, jump straight to the next far time
+                self.now = self.far_times[0]
+                self.pull_far()
+            bucket = self.ring[self.now % self.width]
+            if bucket:
+                self.ring_size -= 1
+                self.size -= 1
+                return bucket.pop()
+            self.ring[self.now % self.width] = None
+            self.now += 1
+            self.pull_far()
+
+    def peek(self, time_stamp):
+        bucket = self.ring[self.now % self.width]
+        if self.now != time_stamp or not bucket:
+            return None
+        return bucket.peek()
+
+    def pull_far(self):
+        while self.far_times and self.far_times[0] < self.now + self.width:
+            t = heapq.heappop(self.far_times)
+            bucket = self.far.pop(t)
+            self.ring[t % self.width] = bucket
+            self.ring_size += len(bucket)
+
+    def events(self):
+        for bucket in self.ring:
+            if bucket:
+                yield from bucket
+        for bucket in self.far.values():
+            yield from bucket
+
+    def __len__(self):
+        return self.size
+
+
+class Radix_Scheduler:
+    """
+    Radix heap: a monotone priority queue for integer time stamps. Events sit
+    in the bucket given by the highest bit in which their time differs from
+    the last time popped, so each event is moved at most once per bit.
+    """
+
+    def __init__(self):
+        self.last = 0
+        self.current = Bucket() # events at time == last
+        self.buckets = [[] for _ in range(64)] # buckets[i]: highest differing bit is i
+        self.size = 0
+
+    def push(self, e):
+        t = e.time_stamp
+        if t == self.last:
+            self.current.add(e)
+        elif t > self.last:
+            self.buckets[(t ^ self.last).bit_length() - 1].append(e)
+        else:
+            raise ValueError("event at time %d posted after time %d" % (t, self.last))
+        self.size += 1
+
+    def pop(self):
+        if self.size == 0:
+            return None
+        if not self.current:
+            i = 0
+            while not self.buckets[i]:
+                i += 1
+            events, self.buckets[i] = self.buckets[i], []
+            self.last = min(e.time_stamp for e in events)
+            for e in events:
+                t = e.time_stamp
+                if t == self.last:
+                    self.current.add(e)
+                else:
+                    self.buckets[(t ^ self.last).bit_length() - 1].append(e)
+        self.size -= 1
+        return self.current.pop()
+
+    def peek(self, time_stamp):
+        # Every event due at last is in current, see push
+        if self.last != time_stamp or not self.current:
+            return None
+        return self.current.peek()
+
+    def events(self):
+        yield from self.current
+        for bucket in self.buckets:
+            yield from bucket
+
+    def __len__(self):
+        return self.size
+
+
+SCHEDULER_QUEUE = {
+    "HEAP": Heap_Scheduler,
+    "CALENDAR": Calendar_Scheduler,
+    "RADIX": Radix_Scheduler
+}
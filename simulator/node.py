@@ -1,6 +1,152 @@
+import json
 import logging
+import struct
+from array import array
+
+
+class Json_Codec:
+    """Routing messages as JSON text (the original format)."""
+
+    name = "json"
+
+    def encode(self, message):
+        return json.dumps(message)
+
+    def decode(self, m):
+        return json.loads(m)
+
+
+class Binary_Codec:
+    """
+    Compact binary routing messages.
+
+    A message is a flat dict of named fields. Each field is an int, a float, a str,
+    a list of ints, or an adjacency map { id1: {id2: cost} } with int costs. Lists and
+    adjacency maps are written as packed native arrays of the narrowest integer type
+    that holds every value, aligned to that type, so Binary_Message can read them
+    straight out of the received buffer.
+
+    Layout: field count (u8), then per field: key length (u8), key, tag (1 byte),
+    value. Tags: i = int64, f = float64, s = u32 length + utf-8, l = array typecode
+    (1 byte) + u32 count + padding + count ints, a = the same with count
+    (id1, id2, cost) triples.
+    """
+
+    name = "binary"
+
+    def encode(self, message):
+        out = bytearray(struct.pack('<B', len(message)))
+        for key, value in message.items():
+            key = key.encode()
+            out += struct.pack('<B', len(key))
+            out += key
+            if isinstance(value, int):
+                out += b'i' + struct.pack('<q', value)
+            elif isinstance(value, float):
+                out += b'f' + struct.pack('<d', value)
+            elif isinstance(value, str):
+                value = value.encode()
+                out += b's' + struct.pack('<I', len(value)) + value
+            elif isinstance(value, dict):
+                flat = []
+                for source, adj in value.items():
+                    for destination, cost in adj.items():
+                        flat.extend((source, destination, cost))
+                self._pack_array(out, b'a', flat, len(flat) // 3)
+            else:
+                self._pack_array(out, b'l', value, len(value))
+        return bytes(out)
+
+    @staticmethod
+    def _pack_array(out, tag, values, count):
+        typecode = 'q'
+        if values:
+            low, high = min(values), max(values)
+            for typecode in 'bhiq':
+                bound = 1 << (8 * array(typecode).itemsize - 1)
+                if -bound <= low and high < bound:
+                    break
+        flat = array(typecode, values)
+        out += tag + typecode.encode() + struct.pack('<I', count)
+        out += bytes(-len(out) % flat.itemsize)
+        out += flat.tobytes()
+
+    def decode(self, m):
+        return Binary_Message(m)
+
+
+class Binary_Message:
+    """
+    Read-only view of a Binary_Codec message. Only the field table is parsed up
+    front; values are unpacked when a field is first read, and arrays are cast
+    in place over the message buffer rather than copied.
+    """
+
+    def __init__(self, buf):
+        self.buf = memoryview(buf)
+        self.fields = {} # { key: (tag, typecode, offset, count) }
+        self.values = {}
+
+        offset = 1
+        for _ in range(self.buf[0]):
+            key_len = self.buf[offset]
+            key = bytes(self.buf[offset + 1:offset + 1 + key_len]).decode()
+            offset += 1 + key_len
+            tag = self.buf[offset:offset + 1].tobytes()
+            offset += 1
+            if tag in (b'i', b'f'):
+                self.fields[key] = (tag, None, offset, 1)
+                offset += 8
+            elif tag == b's':
+                count, = struct.unpack_from('<I', self.buf, offset)
+                self.fields[key] = (tag, None, offset + 4, count)
+                offset += 4 + count
+            else:
+                typecode = chr(self.buf[offset])
+                count, = struct.unpack_from('<I', self.buf, offset + 1)
+                itemsize = array(typecode).itemsize
+                offset += 5
+                offset += -offset % itemsize
+                self.fields[key] = (tag, typecode, offset, count)
+                offset += itemsize * count * (3 if tag == b'a' else 1)
+
+    def __getitem__(self, key):
+        if key not in self.values:
+            self.values[key] = self._unpack(*self.fields[key])
+        return self.values[key]
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def get(self, key, default=None):
+        return self[key] if key in self.fields else default
+
+    def keys(self):
+        return self.fields.keys()
+
+    def _unpack(self, tag, typecode, offset, count):
+        if tag == b'i':
+            return struct.unpack_from('<q', self.buf, offset)[0]
+        if tag == b'f':
+            return struct.unpack_from('<d', self.buf, offset)[0]
+        if tag == b's':
+            return bytes(self.buf[offset:offset + count]).decode()
+
+        itemsize = array(typecode).itemsize
+        if tag == b'l':
+            return self.buf[offset:offset + itemsize * count].cast(typecode)
+
+        flat = self.buf[offset:offset + 3 * itemsize * count].cast(typecode)
+        adjacency = {}
+        for i in range(0, len(flat), 3):
+            adjacency.setdefault(flat[i], {})[flat[i + 1]] = flat[i + 2]
+        return adjacency
+
 
 class Node:
+    codec = Json_Codec() # how routing messages are put on the wire, see encode_message
+    topology = None # the simulation this node belongs to, set by Topology.add_node right after __init__
+
     def __init__(self, id):
         self.id = id
         self.neighbors = []
@@ -12,7 +158,17 @@ class Node:
     def link_has_been_updated(self, neighbor, latency):
         pass
 
-    def process_incoming_routing_message(self, m: str):
+    def process_incoming_routing_message(self, m):
+        pass
+
+    def process_incoming_routing_messages(self, messages):
+        # Batch mode hands over every message that reached this node in the same second at once.
+        # Override to coalesce the work; by default they are processed one at a time.
+        for m in messages:
+            self.process_incoming_routing_message(m)
+
+    def timer_expired(self, tag):
+        # Called delay seconds after set_timer(delay, tag)
         pass
 
     def get_next_hop(self, destination):
@@ -21,17 +177,23 @@ class Node:
     def get_routing_table(self):
         pass
 
-    def send_to_neighbors(self, message: str):
-        from simulator.topology import Send_To_Neighbors
-        Send_To_Neighbors(self, message)
+    def encode_message(self, message):
+        return self.codec.encode(message)
 
-    def send_to_neighbor(self, neighbor, message: str):
-        from simulator.topology import Send_To_Neighbor
-        Send_To_Neighbor(self, neighbor, message)
+    def decode_message(self, m):
+        return self.codec.decode(m)
+
+    def send_to_neighbors(self, message):
+        self.topology.send_to_neighbors(self.id, message)
+
+    def send_to_neighbor(self, neighbor, message):
+        self.topology.send_to_neighbor(self.id, neighbor, message)
 
     def get_time(self):
-        from simulator.topology import Get_Time
-        return Get_Time()
+        return self.topology.get_time()
+
+    def set_timer(self, delay, tag=None):
+        self.topology.post_timer(self.id, delay, tag)
 
 
 class Link:
@@ -42,4 +204,3 @@ class Link:
 
     def __str__(self):
         return "Link: " + str(self.node1) + " " + str(self.node2) + " Latency: " + str(self.latency) + "\n"
-
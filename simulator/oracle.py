@@ -0,0 +1,134 @@
+import heapq
+
+
+# Above this many nodes all-pairs checking falls back to one Dijkstra per source
+FLOYD_WARSHALL_MAX_NODES = 400
+
+
+class Path_Oracle:
+    """
+    Correct shortest paths for the DRAW_PATH and DRAW_TREE checks.
+
+    A single pass per source yields both distances and predecessors, and results
+    are cached until the topology version changes. As soon as a second source is
+    asked for at the same version on a small graph, every source is solved at once
+    with Floyd-Warshall on a dense NumPy matrix, so checking every tree costs one
+    computation.
+    """
+
+    def __init__(self, topology):
+        self.topology = topology
+        self.version = None
+        self.trees = {} # { source: (dist, prev) } valid for self.version
+        self.paths = {} # { source: { destination: path } } valid for self.version
+
+    def tree(self, source):
+        """
+        Returns (dist, prev) for source, covering the nodes reachable from it.
+        """
+        adj = self.topology.adj
+        if self.version != self.topology.version:
+            self.version = self.topology.version
+            self.trees = {}
+            self.paths = {}
+
+        if source not in self.trees:
+            if self.trees and len(adj) <= FLOYD_WARSHALL_MAX_NODES:
+                for s, tree in (floyd_warshall(adj) or {}).items():
+                    self.trees.setdefault(s, tree)
+            if source not in self.trees:
+                self.trees[source] = dijkstra(adj, source)
+        return self.trees[source]
+
+    def path_dict(self, source):
+        """
+        Returns ({ destination: path }, { destination: length }) for every node reachable from source.
+        """
+        dist, prev = self.tree(source)
+        if source not in self.paths:
+            paths = {source: [source]}
+            for v in dist:
+                if v in paths:
+                    continue
+                # Climb to the nearest vertex whose path is known, then fill in on the way back
+                chain = []
+                while v not in paths:
+                    chain.append(v)
+                    v = prev[v]
+                for u in reversed(chain):
+                    paths[u] = paths[v] + [u]
+                    v = u
+            self.paths[source] = paths
+        return self.paths[source], dist
+
+    def path(self, source, destination):
+        """
+        Returns (path, length), or (None, inf) if destination cannot be reached.
+        """
+        paths, dist = self.path_dict(source)
+        if destination not in dist:
+            return None, float("inf")
+        return paths[destination], dist[destination]
+
+
+def dijkstra(adj, source):
+    """
+    Single-source shortest paths over { node: {neighbor: latency} }.
+    Returns (dist, prev) restricted to the nodes reachable from source.
+    """
+    dist = {source: 0}
+    prev = {source: None}
+    done = set()
+    q = [(0, source)]
+    while q:
+        d, u = heapq.heappop(q)
+        if u in done:
+            continue
+        done.add(u)
+        for v, latency in adj[u].items():
+            nd = d + latency
+            if v not in dist or nd < dist[v]:
+                dist[v] = nd
+                prev[v] = u
+                heapq.heappush(q, (nd, v))
+    return dist, prev
+
+
+def floyd_warshall(adj):
+    """
+    All-pairs shortest paths on a dense NumPy matrix.
+    Returns { source: (dist, prev) } like dijkstra, or None if NumPy is not installed.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+
+    nodes = list(adj)
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+
+    dist = np.full((n, n), np.inf)
+    prev = np.full((n, n), -1, dtype=np.int64) # prev[i, j]: index of the node before j on the path i -> j
+    for u, neighbors in adj.items():
+        i = index[u]
+        for v, latency in neighbors.items():
+            dist[i, index[v]] = latency
+            prev[i, index[v]] = i
+    np.fill_diagonal(dist, 0)
+    np.fill_diagonal(prev, -1)
+
+    for k in range(n):
+        through_k = dist[:, k:k + 1] + dist[k:k + 1, :]
+        better = through_k < dist
+        dist = np.where(better, through_k, dist)
+        prev = np.where(better, prev[k:k + 1, :], prev)
+
+    trees = {}
+    for i, source in enumerate(nodes):
+        reachable = np.flatnonzero(np.isfinite(dist[i]))
+        trees[source] = (
+            {nodes[j]: int(dist[i, j]) for j in reachable},
+            {nodes[j]: (nodes[prev[i, j]] if j != i else None) for j in reachable}
+        )
+    return trees
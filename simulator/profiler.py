@@ -0,0 +1,136 @@
+import json
+import time
+
+from simulator.config import *
+from simulator.event import Event_Handlers
+
+
+# Node methods timed per node class and per node id, with the bytes of routing messages each call is handed
+NODE_CALLBACKS = {
+    "link_has_been_updated": None,
+    "process_incoming_routing_message": lambda m: len(m),
+    "process_incoming_routing_messages": lambda messages: sum(len(m) for m in messages),
+    "timer_expired": None,
+    "get_next_hop": None
+}
+
+
+class Profiler:
+    """
+    Opt-in instrumentation of one simulation. attach() replaces the entries of its
+    dispatch table, the event queue methods and each node's callbacks with timed
+    wrappers, so a simulation that is not profiled runs the plain methods.
+
+    Records calls, cumulative and max wall time and routing message bytes per event
+    type, per node callback and per node id, and the inclusive time of every stack
+    of wrapped frames for write()'s collapsed-stack output.
+    """
+
+    def __init__(self):
+        self.stack = () # names of the wrapped frames being executed, outermost first
+        self.node = None # id of the node whose callback is being executed
+        self.stacks = {} # { stack: inclusive nanoseconds }
+        self.event_types = {} # { event type name: stats }
+        self.callbacks = {} # { 'Node_Class.method': stats }
+        self.nodes = {} # { node id: stats, plus bytes sent }
+        self.queue = {} # { 'Event_Queue.method': stats }
+
+    def attach(self, sim):
+        """Instruments sim and rebuilds its dispatch table, see Event_Handlers."""
+        add_node = sim.add_node
+        send_to_neighbor = sim.send_to_neighbor
+
+        def profiled_add_node(node):
+            new = node not in sim.nodes
+            add_node(node)
+            if new and node in sim.nodes:
+                self.instrument(sim.nodes[node])
+
+        def profiled_send_to_neighbor(node, neighbor, m):
+            self.node_stats(node)["bytes_sent"] += len(m)
+            send_to_neighbor(node, neighbor, m)
+
+        sim.add_node = profiled_add_node
+        sim.send_to_neighbor = profiled_send_to_neighbor
+        # Batch mode delivers arrivals through this one instead of the dispatch table
+        sim.routing_messages_arrival = self.timed(sim.routing_messages_arrival, "ROUTING_MESSAGE_ARRIVAL", self.event_types,
+                                                  lambda node, messages: sum(len(m) for m in messages))
+
+        sim.handlers = []
+        for code, handler in enumerate(Event_Handlers(sim)):
+            size = (lambda neighbor, m: len(m)) if code == EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL else None
+            sim.handlers.append(self.timed(handler, EVENT_TYPE_NAME[code], self.event_types, size))
+
+        for method in ("get_earliest", "post"):
+            setattr(sim.event_queue, method, self.timed(getattr(sim.event_queue, method), "Event_Queue." + method, self.queue))
+
+    def instrument(self, node):
+        cls = type(node).__name__
+        for method, size in NODE_CALLBACKS.items():
+            name = "%s.%s" % (cls, method)
+            setattr(node, method, self.timed(getattr(node, method), name, self.callbacks, size, node.id))
+
+    def node_stats(self, node):
+        if node not in self.nodes:
+            self.nodes[node] = {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0, "bytes_sent": 0}
+        return self.nodes[node]
+
+    def timed(self, f, name, table, size=None, node=None):
+        """
+        Returns f wrapped to count its calls and time under name in table, and also
+        under node in self.nodes if given. size(*args) gives the message bytes of a call.
+        A callback called from another callback of the same node, like the default
+        process_incoming_routing_messages, counts once for the node.
+        """
+        stats = table.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0})
+        per_node = self.node_stats(node) if node is not None else None
+        clock = time.perf_counter_ns
+
+        def wrapper(*args):
+            outer, outer_node = self.stack, self.node
+            self.stack = stack = outer + (name,)
+            if node is not None:
+                self.node = node
+            start = clock()
+            try:
+                return f(*args)
+            finally:
+                elapsed = clock() - start
+                self.stack, self.node = outer, outer_node
+                self.stacks[stack] = self.stacks.get(stack, 0) + elapsed
+                nbytes = size(*args) if size is not None else 0
+                for s in (stats, per_node) if per_node is not None and outer_node != node else (stats,):
+                    s["calls"] += 1
+                    s["seconds"] += elapsed / 1e9
+                    s["max_seconds"] = max(s["max_seconds"], elapsed / 1e9)
+                    s["bytes"] += nbytes
+        return wrapper
+
+    def to_json(self):
+        return {
+            "event_types": self.event_types,
+            "callbacks": self.callbacks,
+            "queue": self.queue,
+            "nodes": {str(node): stats for node, stats in sorted(self.nodes.items())}
+        }
+
+    def collapsed(self):
+        """
+        Yields 'frame;frame;frame microseconds' lines with the self time of every stack,
+        the input format of flamegraph.pl and speedscope.
+        """
+        children = {}
+        for stack, inclusive in self.stacks.items():
+            if len(stack) > 1:
+                children[stack[:-1]] = children.get(stack[:-1], 0) + inclusive
+        for stack, inclusive in sorted(self.stacks.items()):
+            own = (inclusive - children.get(stack, 0)) // 1000
+            if own > 0:
+                yield "%s %d\n" % (";".join(("Sim",) + stack), own)
+
+    def write(self, prefix):
+        """Writes prefix.json and prefix.folded."""
+        with open(prefix + ".json", 'w') as f:
+            json.dump(self.to_json(), f, indent=1)
+        with open(prefix + ".folded", 'w') as f:
+            f.writelines(self.collapsed())
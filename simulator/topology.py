@@ -1,44 +1,106 @@
 import sys
+import itertools
+import json
 import logging
 import traceback
 import time
-import networkx as nx
-import matplotlib.pyplot as plt
 
 from simulator.config import *
 from simulator.event import Event
 from simulator.event_queue import Event_Queue
+from simulator.oracle import Path_Oracle
+from simulator.event_file import read_commands, sorted_commands
 
 
-class Topology:
+# Past this many pending changes the networkx mirror is rebuilt from scratch rather than replayed
+MUTATION_LOG_LIMIT = 100000
 
-    Nodes = {}
-    this = None
 
-    def __init__(self, algorithm, step='NORMAL'):
-        self.__g = nx.Graph()
+class Topology:
+    """
+    State of one simulation: the topology, its nodes and the event queue with the clock.
+    Nothing is shared between instances, so several can live in one process.
+    """
+
+    def __init__(self, algorithm, step='NORMAL', scheduler='HEAP', headless=False, results=None):
+        self.adj = {} # { node: {neighbor: latency} }, ground truth used while simulating
+        self.version = 0 # bumped on every change to adj
+        self.mutation_log = None # changes to adj not yet replayed into the networkx mirror, None = rebuild it
+        self.__g = None # networkx mirror of adj, only for drawing, see graph()
+        self.oracle = Path_Oracle(self) # correct paths for DRAW_* checks, cached per version
+        self.event_queue = Event_Queue(scheduler)
         self.node_cls = ROUTE_ALGORITHM_NODE[algorithm]
         self.step = step
+        self.headless = headless or results is not None # check DRAW_* results but never render, so matplotlib is not even imported
+        self.results = results # if set, a text stream that gets each DRAW_* check as one JSON line, see report()
         self.logging = logging.getLogger('Sim')
         self.position = None
         self.message_count = 0
+        self.message_bytes = 0
         self.print_count = 0
-        Topology.Nodes = {}
-        Topology.this = self
+        self.nodes = {} # { node: instance of node_cls }
+        self.sequence = itertools.count(1) # message numbers shared by the nodes, so one deleted and added again numbers above its old self
+        self.in_flight = 0 # routing messages, link updates and node timers posted but not yet delivered
+        self.deliveries = 0 # routing messages, link updates and node timers delivered, any of which may change next hops
+        self.user_paths = None # (version, deliveries, hops, memo) shared by the DRAW_* walks, see user_path_caches()
+        self.convergence = None # optional Convergence_Detector, told about every change
+        self.correctness = None # optional Correctness_Monitor, told about every change and every node that hears something
 
     def __str__(self):
         ans = ""
-        for node in self.__g.nodes:
+        for node in self.adj:
             ans += "node " + str(node) + ": "
-            ans += str(self.__g[node])
+            ans += str(self.adj[node])
             ans += "\n"
         return ans
 
+    def mutate(self, *change):
+        self.version += 1
+        if self.convergence is not None:
+            self.convergence.change()
+        if self.correctness is not None:
+            self.correctness.change(*change)
+        if self.mutation_log is not None:
+            self.mutation_log.append(change)
+            if len(self.mutation_log) > MUTATION_LOG_LIMIT:
+                self.mutation_log = None
+
+    def graph(self):
+        """
+        Returns the networkx mirror of the topology, replaying whatever changed
+        since the last call. Use it for drawing only, DRAW_* checks go through
+        self.oracle.
+        """
+        import networkx as nx
+
+        if self.mutation_log is None:
+            self.__g = nx.Graph()
+            self.__g.add_nodes_from(self.adj)
+            for node, neighbors in self.adj.items():
+                for neighbor, latency in neighbors.items():
+                    self.__g.add_edge(node, neighbor, latency = latency)
+            self.mutation_log = []
+
+        for change in self.mutation_log:
+            if change[0] == 'add_node':
+                self.__g.add_node(change[1])
+            elif change[0] == 'add_link':
+                self.__g.add_edge(change[1], change[2], latency = change[3])
+            elif change[0] == 'delete_link':
+                self.__g.remove_edge(change[1], change[2])
+            elif change[0] == 'delete_node':
+                self.__g.remove_node(change[1])
+        self.mutation_log = []
+        return self.__g
+
     def add_node(self, node):
-        if node not in Topology.Nodes.keys():
+        if node not in self.nodes:
             self.position = None
-            Topology.Nodes[node] = self.node_cls(node)
-        self.__g.add_node(node)
+            self.nodes[node] = self.node_cls(node)
+            self.nodes[node].topology = self
+        if node not in self.adj:
+            self.adj[node] = {}
+            self.mutate('add_node', node)
 
     def add_link(self, node1, node2, latency):
         if latency < 0:
@@ -46,7 +108,9 @@ class Topology:
             sys.exit(-1)
         self.add_node(node1)
         self.add_node(node2)
-        self.__g.add_edge(node1, node2, latency = latency)
+        self.adj[node1][node2] = latency
+        self.adj[node2][node1] = latency
+        self.mutate('add_link', node1, node2, latency)
         self.post_send_link(node1, node2, latency)
         self.post_send_link(node2, node1, latency)
 
@@ -54,14 +118,19 @@ class Topology:
         self.add_link(node1, node2, latency)
 
     def send_link(self, node, neighbor, latency):
-        if node not in Topology.Nodes:
+        self.in_flight -= 1
+        self.deliveries += 1
+        if node not in self.nodes:
             return
-        Topology.Nodes[node].link_has_been_updated(neighbor, latency)
+        if self.correctness is not None:
+            self.correctness.touch(node)
+        self.nodes[node].link_has_been_updated(neighbor, latency)
 
     def post_send_link(self, node, neighbor, latency):
-        Event_Queue.Post(
+        self.in_flight += 1
+        self.event_queue.post(
             Event(
-                Get_Time(),
+                self.event_queue.current_time,
                 EVENT_TYPE.SEND_LINK,
                 self,
                 node,
@@ -70,41 +139,72 @@ class Topology:
             )
         )
 
+    def post_timer(self, node, delay, tag):
+        self.in_flight += 1
+        self.event_queue.post(
+            Event(
+                self.event_queue.current_time + int(delay),
+                EVENT_TYPE.TIMER,
+                self,
+                node,
+                self.nodes[node],
+                tag
+            )
+        )
+
+    def timer(self, node, instance, tag):
+        self.in_flight -= 1
+        self.deliveries += 1
+        # A timer dies with the node that set it, even if a node with the same id was added since
+        if self.nodes.get(node) is not instance:
+            return
+        if self.correctness is not None:
+            self.correctness.touch(node)
+        instance.timer_expired(tag)
+
     def delete_link(self, node1, node2):
-        if (node1, node2) in self.__g.edges:
-            self.__g.remove_edge(node1, node2)
+        if node2 in self.adj.get(node1, ()):
+            del self.adj[node1][node2]
+            del self.adj[node2][node1]
+            self.mutate('delete_link', node1, node2)
             self.post_send_link(node1, node2, -1)
             self.post_send_link(node2, node1, -1)
         else:
             self.logging.warning("remove link (%d, %d) does not exit" % (node1, node2))
 
     def delete_node(self, node):
-        if node in self.__g.nodes:
-            for neighbor in list(self.__g[node].keys()):
+        if node in self.adj:
+            for neighbor in list(self.adj[node].keys()):
                 self.delete_link(node, neighbor)
-            self.__g.remove_node(node)
-            Topology.Nodes.pop(node)
+            del self.adj[node]
+            self.mutate('delete_node', node)
+            self.nodes.pop(node)
             self.position = None
-            self.logging.debug("node %d deleted at time %d" % (node, Get_Time()))
+            self.logging.debug("node %d deleted at time %d" % (node, self.get_time()))
         else:
             self.logging.warning("remove node %d does not exit" % node)
 
     def dump_node(self, node):
-        if (node in self.__g.nodes) and (node in Topology.Nodes.keys()):
-            self.logging.info('DUMP_NODE: ' + str(Topology.Nodes[node]))
+        if (node in self.adj) and (node in self.nodes):
+            self.logging.info('DUMP_NODE: ' + str(self.nodes[node]))
         else:
             self.logging.warning("node %d does not exit" % node)
 
+    def get_time(self):
+        return self.event_queue.get_current_time()
+
     def send_to_neighbors(self, node, m):
-        for neighbor in list(self.__g[node].keys()):
+        for neighbor in list(self.adj[node].keys()):
             self.send_to_neighbor(node, neighbor, m)
 
     def send_to_neighbor(self, node, neighbor, m):
-        if (node, neighbor) not in self.__g.edges:
+        latency = self.adj.get(node, {}).get(neighbor)
+        if latency is None:
             return
-        Event_Queue.Post(
+        self.in_flight += 1
+        self.event_queue.post(
             Event(
-                Get_Time() + int(self.__g[node][neighbor]['latency']),
+                self.event_queue.current_time + int(latency),
                 EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL,
                 self,
                 neighbor,
@@ -113,26 +213,48 @@ class Topology:
         )
 
     def routing_message_arrival(self, neighbor, m):
+        self.in_flight -= 1
+        self.deliveries += 1
         self.message_count += 1
-        if neighbor in self.__g.nodes:
-            Topology.Nodes[neighbor].process_incoming_routing_message(m)
+        self.message_bytes += len(m)
+        if neighbor in self.adj:
+            if self.correctness is not None:
+                self.correctness.touch(neighbor)
+            self.nodes[neighbor].process_incoming_routing_message(m)
+
+    def routing_messages_arrival(self, neighbor, messages):
+        self.in_flight -= len(messages)
+        self.deliveries += 1
+        self.message_count += len(messages)
+        self.message_bytes += sum(len(m) for m in messages)
+        if neighbor in self.adj:
+            if self.correctness is not None:
+                self.correctness.touch(neighbor)
+            self.nodes[neighbor].process_incoming_routing_messages(messages)
 
     def node_labels(self):
-        return {node : str(node) for node in self.__g.nodes}
+        return {node : str(node) for node in self.adj}
 
     def edge_labels(self):
-        return {(node1, node2) : self.__g[node1][node2]['latency'] for node1, node2 in self.__g.edges}
+        g = self.graph()
+        return {(node1, node2) : g[node1][node2]['latency'] for node1, node2 in g.edges}
 
     def draw_topology(self):
+        if self.headless:
+            return
+        import networkx as nx
+        import matplotlib.pyplot as plt
+
+        g = self.graph()
         if self.position == None:
-            self.position = nx.spring_layout(self.__g)
-        nx.draw_networkx_nodes(self.__g, self.position, node_size=600, node_color='b', alpha=0.7)
-        nx.draw_networkx_labels(self.__g, self.position, labels=self.node_labels(), font_size=14, font_color='w')
-        nx.draw_networkx_edges(self.__g, self.position, width=2, alpha=0.5)
-        nx.draw_networkx_edge_labels(self.__g, self.position, edge_labels=self.edge_labels(), font_size=14)
+            self.position = nx.spring_layout(g)
+        nx.draw_networkx_nodes(g, self.position, node_size=600, node_color='b', alpha=0.7)
+        nx.draw_networkx_labels(g, self.position, labels=self.node_labels(), font_size=14, font_color='w')
+        nx.draw_networkx_edges(g, self.position, width=2, alpha=0.5)
+        nx.draw_networkx_edge_labels(g, self.position, edge_labels=self.edge_labels(), font_size=14)
         plt.axis('off')
 
-        filename = 'Topo_' + time.strftime("%H_%M_%S", time.localtime()) + '_Count_' + str(self.print_count) + '_Time_' + str(Get_Time()) + '.png'
+        filename = 'Topo_' + time.strftime("%H_%M_%S", time.localtime()) + '_Count_' + str(self.print_count) + '_Time_' + str(self.get_time()) + '.png'
         self.print_count += 1
         plt.savefig(OUTPUT_PATH + filename) # call savefig before show
         plt.show()
@@ -140,76 +262,129 @@ class Topology:
         self.wait()
 
     def get_correct_path(self, source, destination):
-        try:
-            shortest_path = nx.algorithms.shortest_path(self.__g, source=source, target=destination, weight='latency')
-            shortest_length = nx.algorithms.shortest_path_length(self.__g, source=source, target=destination, weight='latency')
-        except:
+        shortest_path, shortest_length = self.oracle.path(source, destination)
+        if shortest_path == None:
             self.logging.warning("No path from %d to %d, please correct event/topo file" % (source, destination))
-            return None, float("inf")
         return shortest_path, shortest_length
 
 
     def get_correct_path_dict(self, source):
-        try:
-            shortest_paths = nx.algorithms.shortest_path(self.__g, source=source, weight='latency')
-            shortest_lengths = nx.algorithms.shortest_path_length(self.__g, source=source, weight='latency')
-        except:
+        if source not in self.adj:
             self.logging.warning("No Tree from %d, please correct event/topo file" % source)
             return None, float("inf")
+        shortest_paths, shortest_lengths = self.oracle.path_dict(source)
         shortest_path_dict = {(source, k):v for (k,v) in shortest_paths.items() if source != k}
         shortest_length_dict = {(source, k):v for (k,v) in shortest_lengths.items() if source != k}
         return shortest_path_dict, shortest_length_dict
 
 
-    def get_user_path(self, source, destination):
-        path = [source]
-        length = 0
+    def get_user_path(self, source, destination, hops=None, memo=None, quiet=False):
+        """
+        Follows get_next_hop from source until destination is reached.
 
-        while destination not in path:
-            next = Topology.Nodes[path[-1]].get_next_hop(destination)
+        hops caches the nodes' answers as { (node, destination): next_hop } and memo the
+        paths already resolved as { (node, destination): (path, i, length) }, meaning
+        path[i:] is the user's path from node with the given length. Pass the same two
+        dicts to resolve many paths against one forwarding state; each node is then asked
+        once per destination and a walk stops as soon as it joins a known path.
+        With quiet, paths that cannot be followed are not logged.
+        """
+        if hops is None: hops = {}
+        if memo is None: memo = {}
+        path = [source]
+        on_path = {source}
+        lengths = [0] # lengths[i]: length of path[:i+1]
+        tail_length = 0 # length of the memoized part appended to path, if any
+        node = source
+
+        while node != destination:
+            if (node, destination) in memo:
+                known, i, tail_length = memo[(node, destination)]
+                walked = len(path)
+                path += known[i+1:]
+                break
+            if (node, destination) not in hops:
+                hops[(node, destination)] = self.nodes[node].get_next_hop(destination)
+            next = hops[(node, destination)]
             if next == None:
-                self.logging.warning("Your algorithm cannot find a path from %d to %d. Output: %s." % (source, destination, str(path)))
+                if not quiet:
+                    self.logging.warning("Your algorithm cannot find a path from %d to %d. Output: %s." % (source, destination, str(path)))
                 return [], float("inf")
-            elif next == -1 or next not in self.__g.nodes or next in path:
+            elif next == -1 or next not in self.adj or next in on_path:
                 path.append(next)
-                self.logging.warning(
-                    "Your algorithm cannot find a path from %d to %d. Output: %s." % (source, destination, str(path)))
+                if not quiet:
+                    self.logging.warning(
+                        "Your algorithm cannot find a path from %d to %d. Output: %s." % (source, destination, str(path)))
                 return [], float("inf")
-            elif (path[-1], next) not in self.__g.edges:
-                self.logging.warning("Link from %d to %d does not exist, you cannot use it" % (path[-1], next))
+            elif next not in self.adj[node]:
+                if not quiet:
+                    self.logging.warning("Link from %d to %d does not exist, you cannot use it" % (node, next))
                 path.append(next)
                 return [], float("inf")
-            length += self.__g[path[-1]][next]['latency']
+            lengths.append(lengths[-1] + self.adj[node][next])
             path.append(next)
+            on_path.add(next)
+            node = next
+        else:
+            walked = len(path)
+
+        length = lengths[-1] + tail_length
+        for i in range(walked):
+            memo[(path[i], destination)] = (path, i, length - lengths[i])
         return path, length
 
 
-    def get_user_path_dict(self, source):
+    def user_path_caches(self):
+        """
+        Returns the hops and memo dicts of get_user_path for the current forwarding
+        state. They are shared by every DRAW_* check until the topology changes or a
+        node hears something, so a sweep of DRAW_TREEs asks each node once per
+        destination and walks each path once in all.
+        """
+        caches = self.user_paths
+        if caches is None or caches[0] != self.version or caches[1] != self.deliveries:
+            caches = self.user_paths = (self.version, self.deliveries, {}, {})
+        return caches[2], caches[3]
+
+    def get_user_path_dict(self, source, hops=None, memo=None):
+        if hops is None: hops = {}
+        if memo is None: memo = {}
         path_dict, length_dict = {}, {}
-        for d in self.__g.nodes:
+        for d in self.adj:
             if d == source: continue
-            path_dict[(source, d)], length_dict[(source, d)] = self.get_user_path(source, d)
+            path_dict[(source, d)], length_dict[(source, d)] = self.get_user_path(source, d, hops, memo)
         return path_dict, length_dict
 
 
 
     def draw_path(self, source, destination):
-        if (source not in self.__g.nodes) or  (destination not in self.__g.nodes) or (source == destination):
+        if (source not in self.adj) or  (destination not in self.adj) or (source == destination):
             self.logging.warning("Parameters in DRAW_PATH are illegal.")
+            self.report_unchecked("DRAW_PATH", "illegal parameters", source=source, destination=destination)
             return
 
         correct_path, correct_length = self.get_correct_path(source, destination)
         if correct_path == None:
+            self.report_unchecked("DRAW_PATH", "no path", source=source, destination=destination)
             return
 
-        user_path, user_length = self.get_user_path(source, destination)
+        user_path, user_length = self.get_user_path(source, destination, *self.user_path_caches())
+
+        if self.results is not None:
+            self.report({
+                "event": "DRAW_PATH", "source": source, "destination": destination,
+                "correct": correct_length == user_length,
+                "correct_length": json_length(correct_length), "user_length": json_length(user_length),
+                "correct_path": correct_path, "user_path": user_path
+            })
+            return
 
         print("correct_path: (length=%s) %s" % (correct_length, correct_path))
         print("student_path: (length=%s) %s" % (user_length, user_path))
         print("student's solution is %s!\n" % ("correct" if correct_length == user_length else "incorrect"))
 
         red_nodes = [source, destination]
-        blue_nodes = list(self.__g.nodes)
+        blue_nodes = list(self.adj)
         for node in red_nodes:
             blue_nodes.remove(node)
 
@@ -221,15 +396,29 @@ class Topology:
 
 
     def draw_tree(self, source):
-        if source not in self.__g.nodes:
+        if source not in self.adj:
             self.logging.warning("Parameter in DRAW_TREE is illegal.")
+            self.report_unchecked("DRAW_TREE", "illegal parameter", source=source)
             return
 
         correct_path_dict, correct_length_dict = self.get_correct_path_dict(source)
         if correct_path_dict == None:
+            self.report_unchecked("DRAW_TREE", "no tree", source=source)
             return
 
-        user_path_dict, user_length_dict = self.get_user_path_dict(source)
+        user_path_dict, user_length_dict = self.get_user_path_dict(source, *self.user_path_caches())
+
+        if self.results is not None:
+            self.report({
+                "event": "DRAW_TREE", "source": source,
+                "correct": correct_length_dict == user_length_dict,
+                "mismatches": [{
+                    "destination": k[1],
+                    "correct_length": json_length(v), "user_length": json_length(user_length_dict[k]),
+                    "correct_path": correct_path_dict[k], "user_path": user_path_dict[k]
+                } for (k,v) in correct_length_dict.items() if v != user_length_dict[k]]
+            })
+            return
 
         print("checking all paths starting from Node #%d..." % source)
         for (k,v) in correct_length_dict.items():
@@ -240,7 +429,7 @@ class Topology:
         print("student's solution is %s!\n" % ("correct" if correct_length_dict == user_length_dict else "incorrect"))
 
         red_nodes = [source]
-        blue_nodes = list(self.__g.nodes)
+        blue_nodes = list(self.adj)
         blue_nodes.remove(source)
 
         correct_edges, user_edges = set(), set()
@@ -251,22 +440,36 @@ class Topology:
 
         self.draw_in_networkx(red_nodes, blue_nodes, correct_edges, user_edges)
 
+    def report(self, record):
+        self.results.write(json.dumps({"time": self.event_queue.get_current_time(), **record}) + "\n")
+
+    def report_unchecked(self, event, error, **args):
+        # A DRAW_* command that could not be checked still gets its record, with no verdict
+        if self.results is not None:
+            self.report({"event": event, **args, "correct": None, "error": error})
+
     def draw_in_networkx(self, red_nodes, blue_nodes, correct_path, user_path):
+        if self.headless:
+            return
+        import networkx as nx
+        import matplotlib.pyplot as plt
+
+        g = self.graph()
         if self.position == None:
-            self.position = nx.spring_layout(self.__g)
+            self.position = nx.spring_layout(g)
             
-        nx.draw_networkx_nodes(self.__g, self.position, nodelist=blue_nodes, node_size=600, node_color='b', alpha=0.7)
-        nx.draw_networkx_nodes(self.__g, self.position, nodelist=red_nodes, node_size=700, node_color='r', alpha=0.6)
-        nx.draw_networkx_labels(self.__g, self.position, labels=self.node_labels(), font_size=14, font_color='w')
+        nx.draw_networkx_nodes(g, self.position, nodelist=blue_nodes, node_size=600, node_color='b', alpha=0.7)
+        nx.draw_networkx_nodes(g, self.position, nodelist=red_nodes, node_size=700, node_color='r', alpha=0.6)
+        nx.draw_networkx_labels(g, self.position, labels=self.node_labels(), font_size=14, font_color='w')
 
-        nx.draw_networkx_edges(self.__g, self.position, width=2, alpha=0.5)
+        nx.draw_networkx_edges(g, self.position, width=2, alpha=0.5)
         if user_path != None:
-            nx.draw_networkx_edges(self.__g, self.position, edgelist=user_path, width=6, edge_color='r', alpha=0.4)
-        nx.draw_networkx_edges(self.__g, self.position, edgelist=correct_path, width=3, edge_color='g', alpha=0.8)
-        nx.draw_networkx_edge_labels(self.__g, self.position, edge_labels=self.edge_labels(), font_size=14)
+            nx.draw_networkx_edges(g, self.position, edgelist=user_path, width=6, edge_color='r', alpha=0.4)
+        nx.draw_networkx_edges(g, self.position, edgelist=correct_path, width=3, edge_color='g', alpha=0.8)
+        nx.draw_networkx_edge_labels(g, self.position, edge_labels=self.edge_labels(), font_size=14)
         plt.axis('off')
 
-        filename = 'Topo_' + time.strftime("%H_%M_%S", time.localtime()) + '_Count_' + str(self.print_count) + '_Time_' + str(Get_Time()) + '.png'
+        filename = 'Topo_' + time.strftime("%H_%M_%S", time.localtime()) + '_Count_' + str(self.print_count) + '_Time_' + str(self.get_time()) + '.png'
         self.print_count += 1
         plt.savefig(OUTPUT_PATH + filename)  # call savefig before show
         plt.show()
@@ -278,33 +481,19 @@ class Topology:
             return
         input('Press Enter to Continue...')
 
-    def load_command_file(self, file):
+    def load_command_file(self, file, stream=False):
+        """
+        Posts the commands of an event file. With stream, the file is checked up front
+        but its events are read lazily as the simulation reaches them, see
+        Event_Queue.attach; files that are not in time order are sorted externally.
+        """
         try:
-            f = open(file)
-            for line in f.readlines():
-                line = line.strip()
-                if line == "" or line[0] == '#':
-                    continue
-
-                items = line.split(' ')
-                time_stamp = int(items[0])
-                event_type = items[1]
-
-                num_args = len(items) - 2
-                if event_type == EVENT_TYPE.PRINT:
-                    Event_Queue.Post(Event(time_stamp, event_type, self, "".join(items[2:])))
-                elif num_args < 0 or num_args > 3:
-                    sys.stderr.write(line)
-                    raise BufferError
-                elif num_args == 0:
-                    Event_Queue.Post(Event(time_stamp, event_type, self))
-                elif num_args == 1:
-                    Event_Queue.Post(Event(time_stamp, event_type, self, int(items[2])))
-                elif num_args == 2:
-                    Event_Queue.Post(Event(time_stamp, event_type, self, int(items[2]), int(items[3])))
-                elif num_args == 3:
-                    Event_Queue.Post(Event(time_stamp, event_type, self, int(items[2]), int(items[3]), int(items[4])))
-            f.close()
+            if stream:
+                self.event_queue.attach(Event(time_stamp, event_type, self, *args)
+                                        for time_stamp, event_type, args in sorted_commands(file))
+                return
+            for time_stamp, event_type, args in read_commands(file):
+                self.event_queue.post(Event(time_stamp, event_type, self, *args))
 
         except IOError as e:
             print("Can not open file " + file)
@@ -322,11 +511,6 @@ class Topology:
             sys.exit(-1)
 
 
-def Send_To_Neighbors(node, m):
-    Topology.this.send_to_neighbors(node.id, m)
-
-def Send_To_Neighbor(node, neighbor, m):
-    Topology.this.send_to_neighbor(node.id, neighbor, m)
-
-def Get_Time():
-    return Event_Queue.Current_Time
+def json_length(length):
+    # JSON has no infinity, an unreachable destination is reported as null
+    return None if length == float("inf") else length
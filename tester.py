@@ -0,0 +1,135 @@
+"""
+Runs event files through the simulator in parallel and summarizes every DRAW_* check.
+
+    $ python tester.py [--algorithms ALGO ...] [--jobs N] [--timeout SECONDS] [--json] [event ...]
+
+Defaults to every .event file in testing_suite/ and adversarial_cases/, for both
+LINK_STATE and DISTANCE_VECTOR. Each (algorithm, event file) pair runs headless
+in a worker process; the DRAW_* results come back as the records of Sim's
+results stream, see Topology.report. Exits with 1 unless every check passed.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from simulator.config import *
+
+# Found next to this script, named relative to the working directory as events given on the command line are
+DEFAULT_EVENTS = [os.path.relpath(event_file) for directory in ("testing_suite", "adversarial_cases")
+                  for event_file in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), directory, "*.event")))]
+
+DEFAULT_ALGORITHMS = ["LINK_STATE", "DISTANCE_VECTOR"]
+
+
+class Case_Timeout(BaseException):
+    # Not an Exception, so that the simulator's own except Exception clauses cannot swallow it
+    pass
+
+
+def on_alarm(signum, frame):
+    raise Case_Timeout()
+
+
+def run_case(algorithm, event_file, timeout, scheduler='HEAP', batch=False):
+    """
+    Simulates one event file and returns its summary, with one record per DRAW_* check.
+    Runs in a worker process, so it may replace the SIGALRM handler and silence logging.
+    """
+    from sim import Sim
+
+    logging.disable(logging.CRITICAL)
+    results = io.StringIO()
+    output = io.StringIO()
+    case = {"algorithm": algorithm, "event": event_file, "status": "ok", "error": None, "messages": None}
+    if timeout and hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, on_alarm)
+        signal.alarm(timeout)
+
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            s = Sim(algorithm, event_file, "NO_STOP", scheduler, batch=batch, results=results)
+        case["messages"] = s.message_count
+    except Case_Timeout:
+        case["status"] = "timeout"
+    except (Exception, SystemExit) as e:
+        # The loader exits on malformed files, so SystemExit is a failure of this case too
+        case["status"] = "error"
+        case["error"] = "%s: %s\n%s" % (type(e).__name__, e, "".join(output.getvalue().splitlines(True)[-3:]))
+    finally:
+        if timeout and hasattr(signal, "SIGALRM"):
+            signal.alarm(0)
+    case["seconds"] = time.perf_counter() - start
+    case["checks"] = [json.loads(line) for line in results.getvalue().splitlines()]
+    return case
+
+
+def passed(case):
+    return case["status"] == "ok" and all(check["correct"] is True for check in case["checks"])
+
+
+def summary(cases):
+    ans = "%-18s %-45s %-8s %8s %9s %10s\n" % ("algorithm", "event", "status", "checks", "seconds", "messages")
+    for case in cases:
+        ok = sum(check["correct"] is True for check in case["checks"])
+        ans += "%-18s %-45s %-8s %8s %9.2f %10s\n" % (
+            case["algorithm"], case["event"], case["status"] if passed(case) or case["status"] != "ok" else "FAIL",
+            "%d/%d" % (ok, len(case["checks"])), case["seconds"],
+            case["messages"] if case["messages"] is not None else "-")
+
+    for case in cases:
+        if case["error"]:
+            ans += "\n%s %s: %s\n" % (case["algorithm"], case["event"], case["error"])
+        failed = [check for check in case["checks"] if check["correct"] is not True]
+        if failed:
+            ans += "\n%s %s failed checks:\n" % (case["algorithm"], case["event"])
+        for check in failed:
+            if check["correct"] is None:
+                ans += "  time %d %s %s: could not be checked, %s\n" % (
+                    check["time"], check["event"], " -> ".join(str(check[k]) for k in ("source", "destination") if k in check),
+                    check["error"])
+            elif check["event"] == "DRAW_PATH":
+                ans += "  time %d DRAW_PATH %d -> %d: correct length %s, user length %s\n" % (
+                    check["time"], check["source"], check["destination"], check["correct_length"], check["user_length"])
+            else:
+                ans += "  time %d DRAW_TREE %d: %d of the paths differ\n" % (
+                    check["time"], check["source"], len(check["mismatches"]))
+
+    ans += "\n%d of %d cases passed\n" % (sum(passed(case) for case in cases), len(cases))
+    return ans
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run event files through the simulator in parallel.')
+    parser.add_argument('events', nargs='*', default=DEFAULT_EVENTS, help='event files to simulate')
+    parser.add_argument('--algorithms', nargs='+', default=DEFAULT_ALGORITHMS, choices=ROUTE_ALGORITHM)
+    parser.add_argument('--scheduler', default='HEAP', choices=SCHEDULER)
+    parser.add_argument('--batch', action='store_true', help='deliver each node\'s messages of one second together')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--timeout', type=int, default=600, help='seconds per case, 0 for none')
+    parser.add_argument('--json', action='store_true', help='print every case with its checks as JSON lines')
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(run_case, algorithm, event_file, args.timeout, args.scheduler, args.batch)
+                   for algorithm in args.algorithms for event_file in args.events]
+        cases = [future.result() for future in futures]
+
+    if args.json:
+        for case in cases:
+            print(json.dumps(case))
+    else:
+        print(summary(cases), end="")
+    sys.exit(0 if all(passed(case) for case in cases) else 1)
+
+
+if __name__ == '__main__':
+    main()